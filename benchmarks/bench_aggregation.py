@@ -0,0 +1,52 @@
+"""
+Compare the --aggreg-column grouping of load_csv with the previous implementation based on a Python lambda per group.
+
+    python benchmarks/bench_aggregation.py [number of rows]
+"""
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from nexuscli.helpers import csvhelper
+
+
+def legacy_aggregate(reader, aggreg_column):
+    """ The aggregation done by load_csv before csvhelper.aggregate. """
+    grouby_columns = [column for column in reader.columns if column not in aggreg_column]
+    reader = reader.fillna("nan")
+    reader_unique = reader.groupby(by=grouby_columns).agg(lambda x: list(x))
+    reader = reader_unique.reset_index()
+
+    for column in reader.columns:
+        m = [v == ['nan'] or v == "nan" for v in reader[column]]
+        reader.loc[m, column] = np.nan
+    return reader
+
+
+def generate_frame(nb_rows: int, rows_per_entity: int=4):
+    """ Rows describing nb_rows / rows_per_entity entities with three columns to aggregate. """
+    random = np.random.RandomState(42)
+    ids = random.randint(0, max(1, nb_rows // rows_per_entity), nb_rows)
+    return pd.DataFrame({
+        "id": ids,
+        "name": ["entity %d" % i for i in ids],
+        "contributor": random.randint(0, 100, nb_rows).astype(str),
+        "keyword": random.randint(0, 1000, nb_rows).astype(str),
+        "license": random.randint(0, 5, nb_rows).astype(str),
+    })
+
+
+def main(nb_rows: int):
+    df = generate_frame(nb_rows)
+    aggreg_columns = ["contributor", "keyword", "license"]
+    legacy = min(timeit.repeat(lambda: legacy_aggregate(df, aggreg_columns), number=1, repeat=3))
+    current = min(timeit.repeat(lambda: csvhelper.aggregate(df, aggreg_columns), number=1, repeat=3))
+    print("Aggregating {} rows on {} columns:".format(nb_rows, len(aggreg_columns)))
+    print("  lambda per group: {:.3f}s".format(legacy))
+    print("  csvhelper.aggregate: {:.3f}s ({:.1f}x faster)".format(current, legacy / current))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
@@ -0,0 +1,53 @@
+"""
+Measure generate_nexus_payload_checksum, used by the update commands to tell whether a payload changed, on schemas
+with many shapes.
+
+    python benchmarks/bench_checksum.py [number of shapes]
+"""
+import sys
+import timeit
+
+from nexuscli import utils
+
+NB_SHAPES = 2000
+
+
+def generate_schema(nb_shapes: int):
+    shapes = []
+    for i in range(nb_shapes):
+        shapes.append({
+            "@id": "this:Shape%d" % i,
+            "@type": "sh:NodeShape",
+            "label": "Shape %d" % i,
+            "targetClass": "schema:Class%d" % i,
+            "property": [{"path": "schema:property%d" % j, "name": "Property %d" % j, "datatype": "xsd:string",
+                          "minCount": 1, "maxCount": 1} for j in range(10)],
+        })
+    return {
+        "@context": ["https://bluebrain.github.io/nexus/contexts/shacl-20170720.json",
+                     "https://bluebrain.github.io/nexus/contexts/resource.json", {"this": "https://example.org/"}],
+        "@id": "https://example.org/schema",
+        "@type": "Schema",
+        "imports": ["https://example.org/imported%d" % i for i in range(10)],
+        "shapes": shapes,
+        "_rev": 3,
+        "_deprecated": False,
+        "_self": "https://nexus.example.org/v1/schemas/org/project/schema",
+    }
+
+
+def benchmarks(nb_shapes: int=NB_SHAPES):
+    """ Returns the benchmarks as (name, function, number of calls per measure) tuples. """
+    schema = generate_schema(nb_shapes)
+    return [
+        ("checksum, schema of {} shapes".format(nb_shapes), lambda: utils.generate_nexus_payload_checksum(schema), 1),
+    ]
+
+
+def main(nb_shapes: int):
+    for name, function, number in benchmarks(nb_shapes):
+        print("{}: {:.1f}ms".format(name, 1000 * min(timeit.repeat(function, number=number, repeat=5)) / number))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_SHAPES)
@@ -0,0 +1,58 @@
+"""
+Measure the config helpers of utils, which every command calls several times, on a config of a few profiles. The
+config is written in a temporary home directory, the one of the user is left untouched.
+
+    python benchmarks/bench_config.py [number of iterations]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+from nexuscli import utils
+from nexuscli.config import DEFAULT_ORGANISATION_KEY, DEFAULT_PROJECT_KEY, SELECTED_KEY, TOKEN_KEY, URL_KEY
+from nexuscli.helpers import confighelper
+
+NB_PROFILES = 10
+
+
+def generate_config(nb_profiles: int=NB_PROFILES):
+    config = {}
+    for i in range(nb_profiles):
+        config["profile%d" % i] = {URL_KEY: "https://nexus%d.example.org/v1" % i, TOKEN_KEY: "t" * 1000,
+                                   DEFAULT_ORGANISATION_KEY: "org", DEFAULT_PROJECT_KEY: "project",
+                                   SELECTED_KEY: i == nb_profiles - 1}
+    return config
+
+
+def setup():
+    """ Write the config in a temporary home directory. """
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="nexus-cli-bench-")
+    # the config directory is looked up once per process
+    utils._cli_config_dir = None
+    utils.save_cli_config(generate_config())
+
+
+def benchmarks():
+    """ Returns the benchmarks as (name, function, number of calls per measure) tuples. """
+    setup()
+    config = utils.get_cli_config()
+    return [
+        ("config, get_cli_config", utils.get_cli_config, 1000),
+        ("config, get_cli_config parsing the file",
+         lambda: confighelper.ConfigFile(utils.get_cli_config_file()).load(), 1000),
+        ("config, save_cli_config", lambda: utils.save_cli_config(config), 10),
+        ("config, get_selected_deployment_config", utils.get_selected_deployment_config, 1000),
+        ("config, get_organization_label and get_project_label",
+         lambda: (utils.get_organization_label(None), utils.get_project_label(None)), 1000),
+    ]
+
+
+def main(number: int):
+    for name, function, default_number in benchmarks():
+        elapsed = min(timeit.repeat(function, number=number or default_number, repeat=3))
+        print("{}: {:.1f}us".format(name, 1e6 * elapsed / (number or default_number)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
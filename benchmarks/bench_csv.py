@@ -0,0 +1,63 @@
+"""
+Measure the conversion of CSV rows to the records sent by load_csv, both when the file is read in memory (the
+default, and required to merge or aggregate) and when it is streamed in chunks.
+
+    python benchmarks/bench_csv.py [number of rows]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from nexuscli.helpers import csvhelper
+
+NB_ROWS = 100000
+CHUNK_SIZE = 10000
+
+
+def generate_csv(file_path: str, nb_rows: int):
+    random = np.random.RandomState(42)
+    pd.DataFrame({
+        "id": np.arange(nb_rows),
+        "givenName": ["Given %d" % i for i in range(nb_rows)],
+        "familyName": ["Family %d" % i for i in range(nb_rows)],
+        "email": ["person%d@example.org" % i for i in range(nb_rows)],
+        "age": random.randint(0, 90, nb_rows),
+        "height": random.uniform(1.5, 2.0, nb_rows),
+        # missing values are left out of the records
+        "nickname": np.where(random.rand(nb_rows) < 0.5, "", "nick"),
+        "affiliation": random.randint(0, 100, nb_rows).astype(str),
+    }).to_csv(file_path, index=False)
+
+
+def read_in_memory(file_path: str):
+    """ The conversion done by load_csv when the file is read in memory. """
+    reader = csvhelper.read_csv(file_path)
+    reader.drop_duplicates(inplace=True)
+    return csvhelper.frame_to_records(reader)
+
+
+def read_streamed(file_path: str):
+    return list(csvhelper.stream_csv_records(file_path, CHUNK_SIZE))
+
+
+def benchmarks(nb_rows: int=NB_ROWS):
+    """ Returns the benchmarks as (name, function, number of calls per measure) tuples. """
+    file_path = os.path.join(tempfile.mkdtemp(prefix="nexus-cli-bench-"), "rows.csv")
+    generate_csv(file_path, nb_rows)
+    return [
+        ("csv, {} rows to records in memory".format(nb_rows), lambda: read_in_memory(file_path), 1),
+        ("csv, {} rows to records streamed".format(nb_rows), lambda: read_streamed(file_path), 1),
+    ]
+
+
+def main(nb_rows: int):
+    for name, function, number in benchmarks(nb_rows):
+        print("{}: {:.3f}s".format(name, min(timeit.repeat(function, number=number, repeat=3)) / number))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NB_ROWS)
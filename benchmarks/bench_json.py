@@ -0,0 +1,53 @@
+"""
+Compare the JSON encoding of jsonhelper, which uses orjson when it is installed, with the standard library on the
+payloads of the ingestion (one compact row per request) and output (indented listings) hot paths.
+
+    python benchmarks/bench_json.py [number of iterations]
+"""
+import json
+import sys
+import timeit
+
+from nexuscli.helpers import jsonhelper
+
+
+def generate_row(i: int):
+    return {
+        "@id": "https://bbp.epfl.ch/neurosciencegraph/data/Person_%d" % i,
+        "@type": "Person",
+        "id": i,
+        "givenName": "Given %d" % i,
+        "familyName": "Family %d" % i,
+        "email": "person%d@example.org" % i,
+        "affiliation": ["Lab %d" % (i % 10), "Institute %d" % (i % 3)],
+        "age": i % 90,
+    }
+
+
+def generate_listing(size: int=20):
+    results = []
+    for i in range(size):
+        row = generate_row(i)
+        row.update({"_rev": 1, "_deprecated": False, "_self": row["@id"], "_createdAt": "2019-01-01T00:00:00Z"})
+        results.append(row)
+    return {"@context": ["https://bluebrain.github.io/nexus/contexts/resource.json"], "_total": size,
+            "_results": results}
+
+
+def main(number: int):
+    row = generate_row(42)
+    listing = generate_listing()
+    cases = [
+        ("row, compact", lambda: json.dumps(row).encode("utf-8"), lambda: jsonhelper.dumps(row)),
+        ("listing, indented", lambda: json.dumps(listing, indent=2), lambda: jsonhelper.dumps_pretty(listing)),
+    ]
+    print("Encoder: {}".format("orjson" if jsonhelper.orjson is not None else "json (orjson is not installed)"))
+    for name, stdlib, helper in cases:
+        stdlib_time = min(timeit.repeat(stdlib, number=number, repeat=3))
+        helper_time = min(timeit.repeat(helper, number=number, repeat=3))
+        print("  {}: json {:.2f}us, jsonhelper {:.2f}us ({:.1f}x faster)".format(
+            name, 1e6 * stdlib_time / number, 1e6 * helper_time / number, stdlib_time / helper_time))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
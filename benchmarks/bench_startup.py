@@ -0,0 +1,34 @@
+"""
+Measure the cold start of the CLI, in a new interpreter for each run: the help of the CLI and of each command group,
+which imports the module of the group but sends no request.
+
+    python benchmarks/bench_startup.py [number of runs]
+"""
+import subprocess
+import sys
+import timeit
+
+from nexuscli.cli import cli
+
+SCRIPT = "import sys; from nexuscli.cli import cli; cli(sys.argv[1:] + ['--help'])"
+
+
+def run_help(*args):
+    subprocess.check_call([sys.executable, "-c", SCRIPT] + list(args), stdout=subprocess.DEVNULL)
+
+
+def benchmarks():
+    """ Returns the benchmarks as (name, function, number of calls per measure) tuples. """
+    cases = [("startup, nexus --help", run_help, 1)]
+    for group in sorted(cli.lazy_subcommands):
+        cases.append(("startup, nexus {} --help".format(group), lambda group=group: run_help(group), 1))
+    return cases
+
+
+def main(repeat: int):
+    for name, function, number in benchmarks():
+        print("{}: {:.0f}ms".format(name, 1000 * min(timeit.repeat(function, number=number, repeat=repeat))))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,100 @@
+"""
+Run the benchmark suite: the cold start of each command group, the config helpers, the conversion of CSV rows to
+records and the payload checksum. The results are saved in benchmarks/results/<version>.json, and compared with the
+results of the previous version to show the regressions between releases.
+
+    python benchmarks/run_suite.py [--repeat 5] [--filter startup] [--baseline 0.2.0] [--check]
+"""
+import glob
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime
+
+import click
+
+import bench_checksum
+import bench_config
+import bench_csv
+import bench_startup
+from nexuscli import utils
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SUITES = [bench_startup, bench_config, bench_csv, bench_checksum]
+
+
+def load_results(results_dir: str):
+    """ Returns the saved results, by version. """
+    results = {}
+    for file_path in glob.glob(os.path.join(results_dir, "*.json")):
+        with open(file_path) as f:
+            saved = json.load(f)
+        results[saved["version"]] = saved
+    return results
+
+
+def previous_results(results: dict, version: str):
+    """ Returns the most recent results of another version, or the ones of this version if there is none. """
+    others = [saved for saved in results.values() if saved["version"] != version]
+    if others:
+        return max(others, key=lambda saved: saved["timestamp"])
+    return results.get(version)
+
+
+@click.command()
+@click.option('--repeat', '-r', default=5, help='How many times each benchmark is measured, the best time is kept')
+@click.option('_filter', '--filter', '-f', default=None, help='Only run the benchmarks whose name contains this')
+@click.option('--baseline', '-b', default=None,
+              help='Version to compare with, by default the previous one which has results')
+@click.option('--threshold', '-t', default=0.2, help='Relative slowdown reported as a regression')
+@click.option('--check', is_flag=True, default=False, help='Exit with an error if there is a regression')
+@click.option('--results-dir', default=RESULTS_DIR, help='Directory of the results')
+def run_suite(repeat, _filter, baseline, threshold, check, results_dir):
+    version = utils._get_cli_version() or "dev"
+    results = load_results(results_dir)
+    if baseline is not None:
+        if baseline not in results:
+            utils.error("No results saved for version {} in {}".format(baseline, results_dir))
+        previous = results[baseline]
+    else:
+        previous = previous_results(results, version)
+
+    timings = {}
+    regressions = []
+    for suite in SUITES:
+        for name, function, number in suite.benchmarks():
+            if _filter is not None and _filter not in name:
+                continue
+            timings[name] = min(timeit.repeat(function, number=number, repeat=repeat)) / number
+            line = "{}: {:.3f}ms".format(name, 1000 * timings[name])
+            if previous is not None and name in previous["timings"]:
+                change = timings[name] / previous["timings"][name] - 1
+                line += " ({:+.0%} from {})".format(change, previous["version"])
+                if change > threshold:
+                    regressions.append(name)
+                    line += " REGRESSION"
+            print(line)
+
+    os.makedirs(results_dir, exist_ok=True)
+    saved = results.get(version, {"timings": {}})
+    # a filtered run only updates the timings it measured
+    saved["timings"].update(timings)
+    saved.update({"version": version, "timestamp": datetime.utcnow().isoformat() + "Z",
+                  "python": platform.python_version(), "platform": platform.platform(), "repeat": repeat})
+    results_path = os.path.join(results_dir, version + ".json")
+    with open(results_path, "w") as f:
+        json.dump(saved, f, sort_keys=True, indent=4)
+    print("Results saved in {}".format(results_path))
+
+    if regressions:
+        message = "{} regression(s) of more than {:.0%}: {}".format(len(regressions), threshold,
+                                                                   ", ".join(regressions))
+        if check:
+            utils.error(message)
+        utils.warn(message)
+
+
+if __name__ == "__main__":
+    sys.exit(run_suite())
@@ -1,15 +1,60 @@
 import click
 import atexit
+import importlib
 from colorama import init, deinit
 
 init(autoreset=True)
 atexit.register(deinit)
 
-@click.group()
-@click.version_option()
-def cli():
-    pass
 
+class LazyGroup(click.Group):
+    """
+    Group whose subcommands are defined in modules only imported when one of their commands is invoked, so that a
+    command does not pay for the imports of all the others. The help of the group lists them with a static summary.
+    """
+
+    def __init__(self, *args, lazy_subcommands: dict=None, **kwargs):
+        """
+        :param lazy_subcommands: the name of each subcommand mapped to the module defining it and its summary
+        """
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
 
-from nexuscli import profiles, auth, orgs, projects, resources, views, schemas, acls, helpers, realms, resolvers, storages
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_subcommands:
+            # the module registers its commands on this group when imported
+            importlib.import_module(self.lazy_subcommands[cmd_name][0])
+        return super().get_command(ctx, cmd_name)
 
+    def format_commands(self, ctx, formatter):
+        rows = []
+        for name in self.list_commands(ctx):
+            command = self.commands.get(name)
+            if command is None:
+                rows.append((name, self.lazy_subcommands[name][1]))
+            elif not command.hidden:
+                rows.append((name, command.get_short_help_str()))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_subcommands={
+    "acls": ("nexuscli.acls", "ACLs operations"),
+    "auth": ("nexuscli.auth", "Authentication operations"),
+    "orgs": ("nexuscli.orgs", "Organizations operations"),
+    "profiles": ("nexuscli.profiles", "Profiles management operations"),
+    "projects": ("nexuscli.projects", "Projects operations"),
+    "realms": ("nexuscli.realms", "Realms operations"),
+    "resolvers": ("nexuscli.resolvers", "Resolvers operations"),
+    "resources": ("nexuscli.resources", "Resources operations"),
+    "schemas": ("nexuscli.schemas", "Schemas operations"),
+    "storages": ("nexuscli.storages", "Storages operations"),
+    "views": ("nexuscli.views", "Views operations"),
+})
+@click.version_option()
+def cli():
+    pass
@@ -6,4 +6,5 @@ SELECTED_KEY = "selected"
 DEFAULT_ORGANISATION_KEY = "default_organization"
 DEFAULT_PROJECT_KEY = "default_project"
 DEFAULT_REALM_KEY = "default_realm"
-DEFAULT_CLIENT_ID_KEY = "default_client_id"
\ No newline at end of file
+DEFAULT_CLIENT_ID_KEY = "default_client_id"
+CONNECTION_KEY = "connection"
@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import json
+import os
+import random
+import tempfile
+from collections import OrderedDict
+
+
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+# Once the cache exceeds its maximum size, the least recently used entries are evicted down to this ratio of it
+EVICTION_RATIO = 0.8
+ENTRY_SUFFIX = ".json.gz"
+# The size of the cache is checked every EVICTION_INTERVAL writes, as it requires listing all the entries
+EVICTION_INTERVAL = 100
+
+
+class ContentCache:
+    """
+    On-disk cache of JSON payloads, stored gzip compressed in one file per entry. Entries are keyed by a tuple
+    such as (deployment, org, project, id, rev). The cache is bounded in size: the modification time of an entry
+    is updated when it is read and the least recently used entries are evicted first.
+    """
+
+    def __init__(self, directory: str, max_size: int=DEFAULT_MAX_SIZE):
+        """
+        :param directory: the directory of the cache, created on the first write
+        :param max_size: the maximum size in bytes of the compressed entries
+        """
+        self.directory = directory
+        self.max_size = max_size
+        # commands write a few entries each: starting from a random count, the cache is still checked about once
+        # every EVICTION_INTERVAL writes across commands
+        self._writes = random.randrange(EVICTION_INTERVAL)
+
+    def _path(self, key):
+        digest = hashlib.sha256("\n".join(str(part) for part in key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + ENTRY_SUFFIX)
+
+    def contains(self, key):
+        """ Returns whether an entry is cached for the key, without reading it. """
+        return os.path.isfile(self._path(key))
+
+    def get(self, key):
+        """ Returns the payload cached for the key, or None. """
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                payload = json.load(f, object_pairs_hook=OrderedDict)
+            os.utime(path)
+            return payload
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError):
+            # a corrupted entry is dropped and fetched again
+            self._remove(path)
+            return None
+
+    def put(self, key, payload: dict):
+        """ Atomically cache the payload for the key, so that concurrent readers never see a partial entry. """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self._writes += 1
+        if self._writes % EVICTION_INTERVAL == 0:
+            self._evict()
+
+    def _evict(self):
+        """
+        Remove the least recently used entries if the cache is too large, so that it only exceeds its maximum size
+        by the entries written since the last check.
+        """
+        entries = []
+        total = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(ENTRY_SUFFIX):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+        if total <= self.max_size:
+            return
+        for _, size, path in sorted(entries):
+            self._remove(path)
+            total -= size
+            if total <= self.max_size * EVICTION_RATIO:
+                break
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,57 @@
+import copy
+import json
+import os
+import tempfile
+
+
+class ConfigFile:
+    """
+    JSON configuration file loaded once per process. The parsed content is kept in memory with the identity of the
+    file it was read from (inode, modification time and size), and the file is parsed again only when another
+    process replaced it. Writes are atomic, so that a concurrent command never reads a partial file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._signature = None
+        self._data = None
+
+    @staticmethod
+    def _signature_of(path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """
+        Returns a copy of the content of the file, which callers can modify, or None if the file does not exist.
+        """
+        signature = self._signature_of(self.path)
+        if signature is None:
+            return None
+        if signature != self._signature:
+            with open(self.path, 'r') as fp:
+                self._data = json.load(fp)
+            self._signature = signature
+        return copy.deepcopy(self._data)
+
+    def save(self, data: dict):
+        """ Atomically replace the content of the file with the given dictionary. """
+        # a temporary file of its own, so that concurrent commands saving the config never write to the same one
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(data, fp, sort_keys=True, indent=4)
+            # the renamed file keeps the inode and modification time of the temporary one
+            signature = self._signature_of(tmp_path)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._data = copy.deepcopy(data)
+        self._signature = signature
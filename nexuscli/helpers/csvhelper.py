@@ -0,0 +1,209 @@
+import collections
+import os
+import sqlite3
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from nexuscli.helpers import jsonhelper
+
+
+# Numeric and boolean column types, by numpy kind, a column of any other type is read as strings
+_DTYPES = {"i": "int64", "u": "uint64", "f": "float64", "b": "bool"}
+
+
+def read_csv(file_path, chunk_size=None, dtype=None):
+    """
+    Read a CSV file with the options used for resource ingestion.
+    :param file_path: the CSV file to read
+    :param chunk_size: if given, return an iterator of DataFrames of at most chunk_size rows instead of a DataFrame
+    :param dtype: if given, the type of each column instead of the inferred one, see sniff_dtypes
+    """
+    return pd.read_csv(file_path, keep_default_na=False, chunksize=chunk_size, dtype=dtype)
+
+
+def merge_dtypes(kinds):
+    """
+    Returns the type of a column given the numpy kinds it was inferred as in different parts of a file, the way
+    pandas would infer it from the whole file: integers and floats are floats, any other mix is strings.
+    """
+    kinds = set(kinds)
+    if kinds == {"i", "f"}:
+        kinds = {"f"}
+    if len(kinds) == 1:
+        kind = kinds.pop()
+        if kind in _DTYPES:
+            return _DTYPES[kind]
+    return str
+
+
+def sniff_dtypes(file_path, chunk_size):
+    """
+    Returns the type of each column of a CSV file as inferred from the whole file, reading at most chunk_size rows
+    in memory at a time. Reading the file in chunks with these types, the type of a value does not depend on the
+    chunk it falls in.
+    """
+    kinds = _sniff_kinds(file_path, chunk_size)
+    return collections.OrderedDict((column, merge_dtypes(column_kinds)) for column, column_kinds in kinds.items())
+
+
+def _sniff_kinds(file_path, chunk_size):
+    """ Returns the numpy kinds each column of a CSV file is inferred as in its chunks. """
+    kinds = collections.OrderedDict()
+    for chunk in read_csv(file_path, chunk_size=chunk_size):
+        for column in chunk.columns:
+            kinds.setdefault(column, set()).add(chunk[column].dtype.kind)
+    return kinds
+
+
+def frame_to_records(df):
+    """ Returns the rows of a DataFrame as JSON compatible dictionaries, without their missing values. """
+    records = jsonhelper.loads(df.to_json(orient='records'))
+    return [{k: v for k, v in record.items() if v is not None} for record in records]
+
+
+def aggregate(df, aggreg_columns):
+    """
+    Group the rows having the same values in all the columns but the aggregated ones, collecting the values of the
+    aggregated columns of each group in lists. Missing values are left out of the lists and empty lists are missing.
+    Groups are numbered once and the values are split with numpy instead of calling a Python function per group.
+    :param df: the DataFrame to aggregate
+    :param aggreg_columns: the columns to aggregate
+    """
+    group_columns = [column for column in df.columns if column not in aggreg_columns]
+    codes = df.groupby(by=group_columns, sort=False, dropna=False).ngroup().to_numpy()
+    nb_groups = int(codes.max()) + 1 if len(codes) > 0 else 0
+
+    # with sort=False groups are numbered in order of appearance, so the first row of each group comes in order
+    first_rows = np.zeros(len(codes), dtype=bool)
+    first_rows[np.unique(codes, return_index=True)[1]] = True
+    result = df.loc[first_rows, group_columns].reset_index(drop=True)
+
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    for column in aggreg_columns:
+        values = df[column].to_numpy()[order]
+        present = pd.notna(values)
+        counts = np.bincount(sorted_codes[present], minlength=nb_groups)
+        groups = np.split(values[present], np.cumsum(counts)[:-1])
+        result[column] = pd.Series([group.tolist() if len(group) > 0 else None for group in groups], dtype=object)
+    return result
+
+
+def stream_csv_records(file_path, chunk_size):
+    """
+    Lazily yield the rows of a CSV file as dictionaries, reading at most chunk_size rows in memory at a time.
+    Column types are inferred from the whole file in a first pass, see sniff_dtypes, but duplicated rows are only
+    dropped within a chunk.
+    :param file_path: the CSV file to read
+    :param chunk_size: the number of rows to parse at a time
+    """
+    dtypes = sniff_dtypes(file_path, chunk_size)
+    for chunk in read_csv(file_path, chunk_size=chunk_size, dtype=dtypes):
+        chunk.drop_duplicates(inplace=True)
+        for record in frame_to_records(chunk):
+            yield record
+
+
+def merged_column_names(columns_per_file, on):
+    """
+    Name the columns of the outer join of several files the way successive pandas merges would: a column found in
+    the result so far and in the next file is suffixed with '_x' in the former and '_y' in the latter.
+    :param columns_per_file: the list of the columns of each file
+    :param on: the column to join on
+    :return: for each file, the list of the names of its columns in the result
+    """
+    names_per_file = []
+    for columns in columns_per_file:
+        names = [column for column in columns]
+        for column in columns:
+            if column == on:
+                continue
+            for previous_names in names_per_file:
+                if column in previous_names:
+                    previous_names[previous_names.index(column)] = column + "_x"
+                    names[names.index(column)] = column + "_y"
+        names_per_file.append(names)
+    return names_per_file
+
+
+def _quote(identifier: str):
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+def merge_csv_on_disk(file_paths, on, chunk_size):
+    """
+    Outer join CSV files on a column with bounded memory: the files are loaded chunk by chunk in a temporary SQLite
+    database indexed on the join column, and the joined rows are read back ordered by that column.
+    :param file_paths: the CSV files to join
+    :param on: the column to join on
+    :param chunk_size: the number of rows loaded or returned at a time
+    :return: an iterator of DataFrames of at most chunk_size joined rows
+    """
+    with tempfile.TemporaryDirectory(prefix="nexus-cli-merge-") as tmp_dir:
+        connection = sqlite3.connect(os.path.join(tmp_dir, "merge.db"))
+        try:
+            connection.execute("PRAGMA journal_mode=OFF")
+            connection.execute("PRAGMA synchronous=OFF")
+            # the types of the columns are fixed for all the chunks of a file, and the one of the join column for
+            # all the files, so that SQLite compares and returns the values of a column the same way
+            kinds_per_file = [_sniff_kinds(file_path, chunk_size) for file_path in file_paths]
+            for file_path, kinds in zip(file_paths, kinds_per_file):
+                if on not in kinds:
+                    raise ValueError("The column '%s' to merge on is missing from %s" % (on, file_path))
+            on_dtype = merge_dtypes(set().union(*(kinds[on] for kinds in kinds_per_file)))
+            columns_per_file = []
+            bool_columns = set()
+            for i, (file_path, kinds) in enumerate(zip(file_paths, kinds_per_file)):
+                table = _quote("t%d" % i)
+                columns = list(kinds)
+                dtypes = {column: merge_dtypes(k) for column, k in kinds.items()}
+                dtypes[on] = on_dtype
+                bool_columns.update((i, c) for c in columns if dtypes[c] == "bool")
+                connection.execute("CREATE TABLE %s (%s)" % (table, ", ".join(_quote(c) for c in columns)))
+                for chunk in read_csv(file_path, chunk_size=chunk_size, dtype=dtypes):
+                    connection.executemany("INSERT INTO %s VALUES (%s)" % (table, ", ".join("?" * len(columns))),
+                                           chunk.itertuples(index=False, name=None))
+                connection.execute("CREATE INDEX %s ON %s (%s)" % (_quote("t%d_on" % i), table, _quote(on)))
+                columns_per_file.append(columns)
+            connection.commit()
+
+            names_per_file = merged_column_names(columns_per_file, on)
+            selected = ["keys.k"]
+            names = [on]
+            joins = []
+            bool_names = set()
+            for i, (columns, file_names) in enumerate(zip(columns_per_file, names_per_file)):
+                joins.append("LEFT JOIN t%d ON t%d.%s = keys.k" % (i, i, _quote(on)))
+                for column, name in zip(columns, file_names):
+                    if column != on:
+                        selected.append("t%d.%s" % (i, _quote(column)))
+                        names.append(name)
+                        if (i, column) in bool_columns:
+                            bool_names.add(name)
+            keys = " UNION ".join("SELECT %s AS k FROM t%d" % (_quote(on), i) for i in range(len(file_paths)))
+            cursor = connection.execute("SELECT %s FROM (%s) AS keys %s ORDER BY keys.k"
+                                        % (", ".join(selected), keys, " ".join(joins)))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                # object columns keep the integers as integers when some values are missing
+                chunk = pd.DataFrame(rows, columns=names, dtype=object)
+                for name in bool_names:
+                    chunk[name] = chunk[name].map(lambda v: v if v is None else bool(v))
+                yield chunk
+        finally:
+            connection.close()
+
+
+def stream_merged_csv_records(file_paths, on, chunk_size):
+    """
+    Lazily yield the rows of the outer join of CSV files as dictionaries, see merge_csv_on_disk.
+    Duplicated rows are only dropped within a chunk.
+    """
+    for chunk in merge_csv_on_disk(file_paths, on, chunk_size):
+        chunk.drop_duplicates(inplace=True)
+        for record in frame_to_records(chunk):
+            yield record
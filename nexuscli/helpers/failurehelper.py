@@ -0,0 +1,54 @@
+import os
+import tempfile
+from datetime import datetime
+
+from nexuscli.helpers import jsonhelper
+
+# Rows which could not be ingested are logged as one JSON record per line (NDJSON), in the current directory
+ERRORS_FILE = "errors.ndjson"
+
+
+def failure_record(status, body, row: dict, org: str, project: str, schema: str):
+    """
+    Describe a row which could not be ingested.
+    :param status: the HTTP status of the last response, or the name of the error if there was none
+    :param body: the body of the last response, as JSON if it could be decoded
+    :param row: the row as it was sent
+    :param org: the organization the row was sent to
+    :param project: the project the row was sent to
+    :param schema: the schema the row was validated against
+    """
+    return {"status": status, "body": body, "row": row, "timestamp": datetime.utcnow().isoformat() + "Z",
+            "org": org, "project": project, "schema": schema}
+
+
+def write_failures(file_path: str, records):
+    """ Atomically replace the failure log with the given records. """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for record in records:
+                f.write(jsonhelper.dumps(record) + b"\n")
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_failures(file_path: str, statuses=None):
+    """
+    Lazily yield the records of a failure log.
+    :param file_path: the NDJSON file written by write_failures
+    :param statuses: if given, only yield the records whose status is one of these, compared as strings
+    """
+    with open(file_path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = jsonhelper.loads(line)
+            if statuses and str(record["status"]) not in statuses:
+                continue
+            yield record
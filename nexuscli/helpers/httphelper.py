@@ -0,0 +1,326 @@
+import asyncio
+import collections
+import gzip
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+from nexuscli.helpers import jsonhelper
+
+# Statuses worth retrying: the server (or a gateway in front of it) is overloaded or temporarily unavailable
+RETRYABLE_STATUSES = frozenset([408, 429, 500, 502, 503, 504])
+# Statuses of the failed attempts which may still have been processed by the server, e.g. a gateway timing out
+MAYBE_PROCESSED_STATUSES = frozenset([408, 500, 502, 504])
+MAX_BACKOFF_DELAY = 60.0
+BASELINE_LATENCY_DRIFT = 1.01
+
+# Settings of the connection pool of the async commands, each can be overridden in the profile config
+DEFAULT_CONNECTION_SETTINGS = {
+    "limit": 100,  # maximum number of open connections, 0 for no limit
+    "limit_per_host": 0,  # maximum number of open connections to the same host, 0 for no limit
+    "keepalive_timeout": 15.0,  # seconds an idle connection is kept open for reuse
+    "dns_ttl": 300,  # seconds a DNS resolution is cached
+    "timeout_total": 300.0,  # seconds a request may take in total
+    "timeout_connect": 30.0,  # seconds to get a connection from the pool and establish it
+    "timeout_read": 120.0,  # seconds to wait for data from the server
+}
+
+
+def is_retryable_status(status: int):
+    return status in RETRYABLE_STATUSES
+
+
+def parse_retry_after(value: str):
+    """
+    Parse the value of a Retry-After header.
+    :param value: the header value, either a number of seconds or an HTTP date
+    :return: the number of seconds to wait, or None if the value is missing or invalid
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base: float, retry_after: float=None, max_delay: float=MAX_BACKOFF_DELAY):
+    """
+    Compute how long to wait before the next attempt using exponential backoff with full jitter.
+    :param attempt: the number of attempts already made, starting at 0
+    :param base: the delay in seconds of the first backoff
+    :param retry_after: if given, the delay requested by the server which is then waited at least
+    :param max_delay: upper bound of the exponential delay
+    """
+    delay = random.uniform(0, min(max_delay, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class AdaptiveLimiter:
+    """
+    Limit the number of in-flight requests, adapting the limit with an additive increase/multiplicative decrease
+    (AIMD) policy: the limit grows by one after each window of healthy requests and is cut when the p95 latency
+    or the error rate of a window degrade.
+    """
+
+    def __init__(self, max_limit: int, initial_limit: int=4, min_limit: int=1, latency_tolerance: float=2.0,
+                 max_error_rate: float=0.05, backoff_ratio: float=0.7):
+        """
+        :param max_limit: the maximum number of in-flight requests
+        :param initial_limit: the number of in-flight requests to start with
+        :param min_limit: the minimum number of in-flight requests
+        :param latency_tolerance: a window is degraded if its p95 latency exceeds the best p95 seen times this ratio
+        :param max_error_rate: a window is degraded if the ratio of overloaded or failed requests exceeds this rate
+        :param backoff_ratio: the ratio the limit is multiplied by when a window is degraded
+        """
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.limit = max(self.min_limit, min(initial_limit, max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self.baseline_latency = None
+        self._latencies = []
+        self._errors = 0
+        self._waiters = collections.deque()
+
+    async def acquire(self):
+        while self.in_flight >= self.limit:
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        self.in_flight += 1
+
+    def release(self, latency: float, overloaded: bool):
+        """
+        Release a slot taken by acquire().
+        :param latency: how long the request took in seconds
+        :param overloaded: true if the request failed with a transient error (see RETRYABLE_STATUSES)
+        """
+        self.in_flight -= 1
+        self._latencies.append(latency)
+        if overloaded:
+            self._errors += 1
+        if len(self._latencies) >= max(self.limit, 20):
+            self._adjust()
+        self._wake_up()
+
+    def _adjust(self):
+        latencies = sorted(self._latencies)
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        error_rate = self._errors / len(latencies)
+        self._latencies = []
+        self._errors = 0
+        if self.baseline_latency is None or p95 < self.baseline_latency:
+            self.baseline_latency = p95
+        else:
+            # let the baseline drift up slowly so that a lasting change of the server latency is eventually accepted
+            self.baseline_latency *= BASELINE_LATENCY_DRIFT
+        if error_rate > self.max_error_rate or p95 > self.baseline_latency * self.latency_tolerance:
+            self.limit = max(self.min_limit, int(self.limit * self.backoff_ratio))
+        else:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+    def _wake_up(self):
+        available = self.limit - self.in_flight
+        while available > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                available -= 1
+
+
+class TokenBucket:
+    """
+    Token bucket limiting the rate of requests, shared by the bulk commands so that they never exceed the
+    requests-per-second budget of a deployment. Waiting requests are served in order.
+    """
+
+    def __init__(self, rate: float, burst: int=1):
+        """
+        :param rate: the number of requests allowed per second
+        :param burst: the number of requests that can be sent at once after an idle period
+        """
+        self.rate = float(rate)
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self):
+        """ Take a token and return how many seconds to wait before it can be used. """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def wait(self):
+        """ Blocking version of acquire() for the synchronous code paths. """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def create_rate_limiter(max_rps: float, burst: int=1):
+    """ Returns a TokenBucket enforcing max_rps requests per second, or None if max_rps is not set. """
+    if max_rps is None:
+        return None
+    return TokenBucket(max_rps, burst)
+
+
+GZIP_LEVEL = 6
+
+
+def compress_body(data: bytes, threshold: int):
+    """
+    Gzip a request body if it is at least threshold bytes long.
+    :return: the body to send and the headers to send with it
+    """
+    if len(data) < threshold:
+        return data, None
+    return gzip.compress(data, compresslevel=GZIP_LEVEL), {"Content-Encoding": "gzip"}
+
+
+def connection_limit(settings: dict, limit: int=None):
+    """
+    Returns the maximum number of open connections of a pool: the one of the settings, or the given limit if it is
+    lower, where 0 means no limit.
+    """
+    if limit is None or limit <= 0:
+        return settings["limit"]
+    if settings["limit"] <= 0:
+        return limit
+    return min(settings["limit"], limit)
+
+
+def create_client_session(settings: dict, headers: dict=None, limit: int=None):
+    """
+    Create the aiohttp session used by the async commands, with a tuned connection pool and timeouts.
+    :param settings: the connection settings, see DEFAULT_CONNECTION_SETTINGS
+    :param headers: the headers sent with every request
+    :param limit: if given, the number of connections the command needs at most, capped by the limit of the
+    settings
+    """
+    # imported here as aiohttp is slow to import and only needed by the async commands
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=connection_limit(settings, limit),
+                                     limit_per_host=settings["limit_per_host"],
+                                     keepalive_timeout=settings["keepalive_timeout"],
+                                     use_dns_cache=True,
+                                     ttl_dns_cache=settings["dns_ttl"])
+    timeout = aiohttp.ClientTimeout(total=settings["timeout_total"], connect=settings["timeout_connect"],
+                                    sock_read=settings["timeout_read"])
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers)
+
+
+async def read_error_body(response):
+    """ Returns the body of an error response, decoded as JSON if possible. """
+    text = await response.text()
+    try:
+        return jsonhelper.loads(text)
+    except ValueError:
+        return text
+
+
+class RetryingClient:
+    """
+    Send requests through an aiohttp session, retrying the transient failures with exponential backoff. Requests
+    go through the optional rate and concurrency limiters and every attempt is counted in the statistics.
+    """
+
+    def __init__(self, session, stats, max_retries: int=5, retry_backoff: float=0.5, rate_limiter=None,
+                 limiter=None, gzip_threshold: int=None):
+        """
+        :param session: the session to send the requests with, see create_client_session
+        :param stats: the statshelper.IngestionStats to record the requests in
+        :param max_retries: the maximum number of retries of a request failing with a transient error
+        :param retry_backoff: the base delay in seconds of the exponential backoff between retries
+        :param rate_limiter: an optional TokenBucket every attempt must go through
+        :param limiter: an optional AdaptiveLimiter every attempt must go through
+        :param gzip_threshold: if given, request bodies of at least this many bytes are gzipped
+        """
+        import aiohttp
+
+        self.session = session
+        self.stats = stats
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.rate_limiter = rate_limiter
+        self.limiter = limiter
+        self.gzip_threshold = gzip_threshold
+        self.transient_errors = (aiohttp.ClientError, asyncio.TimeoutError)
+
+    async def request(self, method: str, url: str, data: bytes=None, params: dict=None, read_body: bool=False,
+                      created_on_conflict: bool=False):
+        """
+        Send a request, retrying transient failures.
+        :param created_on_conflict: for requests creating a resource, return a 409 Conflict following an attempt
+        which may have been processed by the server (a timeout, connection error or gateway error) as a 201 Created:
+        the resource the retry conflicts with was created by that attempt
+        :return: the status (or the name of the error if there was no response) and the body, which is the JSON of
+        a successful response if read_body is true and the body of an error response
+        """
+        request_headers = None
+        if data is not None:
+            raw_size = len(data)
+            if self.gzip_threshold is not None:
+                data, request_headers = compress_body(data, self.gzip_threshold)
+            self.stats.record_body(raw_size, len(data))
+        attempt = 0
+        maybe_processed = False
+        while True:
+            retry_after = None
+            overloaded = True
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            if self.limiter is not None:
+                await self.limiter.acquire()
+            start = time.monotonic()
+            status = None
+            try:
+                async with self.session.request(method, url, data=data, params=params,
+                                                headers=request_headers) as response:
+                    status = response.status
+                    overloaded = is_retryable_status(status)
+                    if not overloaded or attempt >= self.max_retries:
+                        if status == 409 and created_on_conflict and maybe_processed:
+                            return 201, None
+                        body = None
+                        if status >= 300:
+                            body = await read_error_body(response)
+                        elif read_body:
+                            body = await response.json(loads=jsonhelper.loads, content_type=None)
+                        return status, body
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    maybe_processed = maybe_processed or status in MAYBE_PROCESSED_STATUSES
+            except self.transient_errors as e:
+                status = type(e).__name__
+                maybe_processed = True
+                if attempt >= self.max_retries:
+                    return status, None
+            finally:
+                latency = time.monotonic() - start
+                if status is not None:
+                    self.stats.record_request(status, latency)
+                if self.limiter is not None:
+                    self.limiter.release(latency, overloaded)
+            self.stats.retries += 1
+            await asyncio.sleep(backoff_delay(attempt, self.retry_backoff, retry_after))
+            attempt += 1
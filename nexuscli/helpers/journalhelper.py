@@ -0,0 +1,102 @@
+import json
+import os
+import time
+
+# The journal starts with a JSON header identifying the ingested source. It is followed by lines that are either
+# the offset of a row that was ingested or a watermark line 'w <offset>' meaning all rows before offset were ingested.
+WATERMARK_PREFIX = "w "
+FLUSH_INTERVAL = 1.0
+
+
+class JournalMismatchException(ValueError):
+    pass
+
+
+class IngestionJournal:
+    """
+    Append-only journal of the offsets of the rows successfully ingested, used to resume an interrupted ingestion.
+    """
+
+    def __init__(self, path: str, fingerprint: dict, resume: bool=False):
+        """
+        Open the journal, truncating it unless resuming.
+        :param path: the journal file
+        :param fingerprint: a description of the ingested source and options, a journal is only resumed if its
+        fingerprint is the same
+        :param resume: if true, load the rows already ingested from the journal
+        """
+        self.path = path
+        self.watermark = 0
+        self.done = set()
+        # the offsets are written in batches, so the last rows ingested before an interruption may be missing
+        self.resumed = resume and os.path.isfile(path)
+        if self.resumed:
+            self._load(fingerprint)
+        self._compact(fingerprint)
+        self._file = open(path, "a")
+        self._last_flush = time.time()
+
+    def _load(self, fingerprint: dict):
+        with open(self.path, "r") as f:
+            header = f.readline()
+            if not header.strip():
+                return
+            if json.loads(header) != fingerprint:
+                raise JournalMismatchException("The journal %s was written for a different source or options, "
+                                               "remove it to start over." % self.path)
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith(WATERMARK_PREFIX):
+                    self.watermark = max(self.watermark, int(line[len(WATERMARK_PREFIX):]))
+                else:
+                    self.done.add(int(line))
+        self._advance_watermark()
+
+    def _advance_watermark(self):
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+        self.done = set(offset for offset in self.done if offset >= self.watermark)
+
+    def _compact(self, fingerprint: dict):
+        """ Atomically rewrite the journal as its header, the watermark and the offsets above it. """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps(fingerprint, sort_keys=True) + "\n")
+            if self.watermark > 0:
+                f.write("%s%d\n" % (WATERMARK_PREFIX, self.watermark))
+            for offset in sorted(self.done):
+                f.write("%d\n" % offset)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self):
+        return self.watermark + len(self.done)
+
+    def is_done(self, offset: int):
+        return offset < self.watermark or offset in self.done
+
+    def mark_done(self, offset: int):
+        self._file.write("%d\n" % offset)
+        now = time.time()
+        if now - self._last_flush > FLUSH_INTERVAL:
+            self._file.flush()
+            self._last_flush = now
+
+    def close(self):
+        self._file.close()
+
+
+def source_fingerprint(file_paths, **options):
+    """ Describe the given source files and ingestion options so that a journal is only resumed on the same input. """
+    files = []
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        files.append({"path": os.path.abspath(file_path), "size": stat.st_size, "mtime": stat.st_mtime})
+    return json.loads(json.dumps({"files": files, "options": options}, sort_keys=True))
+
+
+def default_journal_path(file_path: str):
+    """ Returns the path of the journal of an ingested file, in the current directory like the failure log. """
+    return os.path.basename(file_path) + ".journal"
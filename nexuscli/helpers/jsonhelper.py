@@ -0,0 +1,45 @@
+import json
+import re
+
+# orjson is an optional dependency (pip install nexus-cli[fast]), the standard library is used when it is missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson decodes the integers which do not fit in 64 bits as floats, losing their precision: the JSON containing
+# numbers of 19 digits or more is decoded by the standard library (a long run of digits in a string only costs speed)
+_LONG_DIGITS = re.compile(r"[0-9]{19}")
+_LONG_DIGITS_BYTES = re.compile(rb"[0-9]{19}")
+
+
+def dumps(data) -> bytes:
+    """ Encode data as compact UTF-8 JSON, suitable as a request body. """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            # e.g. non-string keys or integers larger than 64 bits, which the standard library supports
+            pass
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dumps_pretty(data) -> str:
+    """ Encode data as JSON indented with 2 spaces, for display. """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(data, indent=2)
+
+
+def loads(data):
+    """ Decode JSON from str or bytes. """
+    if isinstance(data, str):
+        if orjson is not None and not _LONG_DIGITS.search(data):
+            return orjson.loads(data)
+        return json.loads(data)
+    if orjson is not None and not _LONG_DIGITS_BYTES.search(data):
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# Page size used when streaming a whole listing, unless a larger --size is given
+ALL_PAGE_SIZE = 100
+
+
+def iter_results(list_page, fetch_next, size: int, _from: int=0):
+    """
+    Lazily yield all the results of a listing, fetching the next page in a background thread while the results
+    of the current one are consumed. Only two pages are held in memory at a time.
+    :param list_page: function returning the page of at most size results starting at offset _from, called as
+    list_page(_from, size)
+    :param fetch_next: function returning the page at the URL given by the '_next' link of a page, which is
+    followed when present instead of computing the next offset
+    :param size: the number of results per page
+    :param _from: the offset of the first result
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(list_page, _from, size)
+        while future is not None:
+            page = future.result()
+            results = page.get("_results", [])
+            _from += len(results)
+            future = None
+            if len(results) > 0:
+                if page.get("_next"):
+                    future = executor.submit(fetch_next, page["_next"])
+                elif _from < page.get("_total", 0):
+                    future = executor.submit(list_page, _from, size)
+            for result in results:
+                yield result
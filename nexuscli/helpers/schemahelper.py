@@ -135,11 +135,17 @@ def get_schema_transitive_import_closure(schema_json,schemas_lookup_base,_schema
     except Exception as e:
         raise OWLImportException("""Failed to build the transitive import closure: %s""" % (str(e))) from e
 
-def _import_schema(url, schema, _org_label, _prj_label,_strategy ):
+def _import_schema(url, schema, _org_label, _prj_label,_strategy, rate_limiter=None):
     nxs = utils.get_nexus_client()
+
+    def throttle():
+        if rate_limiter is not None:
+            rate_limiter.wait()
+
     if "@id" in schema:
         schema_uri = schema["@id"]
         try:
+            throttle()
             schema_in_nexus = nxs.schemas.fetch(org_label=_org_label, project_label=_prj_label, schema_id=schema_uri)
             schema_in_nexus = json.loads(json.dumps(schema_in_nexus))
             current_revision = 0
@@ -156,18 +162,21 @@ def _import_schema(url, schema, _org_label, _prj_label,_strategy ):
                 schema_md5_after = utils.generate_nexus_payload_checksum(schema)
 
                 if schema_md5_before != schema_md5_after:
+                    throttle()
                     nxs.schemas.update(schema=schema, rev=current_revision)
             if _strategy == UPDATE_IF_EXISTS:
+                throttle()
                 nxs.schemas.update(schema=schema, rev=current_revision)
         except nxs.HTTPError as e:
 
             if e.response.status_code == 404: # the schema does not exist
+                throttle()
                 return nxs.schemas.create(org_label=_org_label, project_label=_prj_label, schema_obj=schema,
                                           schema_id=None)
 
 
 
-def import_schemas( path, org, domain, schemas_lookup_base, _schemas_ns, _strategy=UPDATE_IF_DIFFERENT):
+def import_schemas( path, org, domain, schemas_lookup_base, _schemas_ns, _strategy=UPDATE_IF_DIFFERENT, rate_limiter=None):
         _already_imported_schemas=[]
 
         schema_file_uris=filehelper.get_files_by_extensions(path, ".json")
@@ -194,10 +203,10 @@ def import_schemas( path, org, domain, schemas_lookup_base, _schemas_ns, _strate
                                         message = """Unable to import the schema: it imported a deprecated schema %s""" % (schema_file_uri,source_url)
                                         raise DeprecatedSchemaImportException(message)
 
-                                    _import_schema(source_url,schema_json,org,domain,_strategy)
+                                    _import_schema(source_url,schema_json,org,domain,_strategy,rate_limiter)
                                     _already_imported_schemas.append(source_url)
                                     imported.append(source_url)
-                        _import_schema(schema_file_uri,json_data,org,domain,_strategy)
+                        _import_schema(schema_file_uri,json_data,org,domain,_strategy,rate_limiter)
                         _already_imported_schemas.append(schema_file_uri)
                         imported.append(schema_file_uri)
                         counter += 1
@@ -0,0 +1,124 @@
+import collections
+import math
+
+# Latencies are counted in buckets growing geometrically from MIN_LATENCY, so that percentiles are known within
+# LATENCY_PRECISION whatever their magnitude while the histogram of millions of requests stays a few hundred integers
+MIN_LATENCY = 0.0001
+LATENCY_PRECISION = 0.05
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """ Compact histogram of request latencies, from which approximate percentiles are computed. """
+
+    def __init__(self):
+        self.buckets = collections.Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def _bucket(latency: float):
+        if latency <= MIN_LATENCY:
+            return 0
+        return int(math.log(latency / MIN_LATENCY) / math.log1p(LATENCY_PRECISION)) + 1
+
+    @staticmethod
+    def _upper_bound(bucket: int):
+        return MIN_LATENCY * (1 + LATENCY_PRECISION) ** bucket
+
+    def record(self, latency: float):
+        """ Count a request which took latency seconds. """
+        self.buckets[self._bucket(latency)] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float):
+        """ Returns the latency under which p percent of the requests completed, or None if none was recorded. """
+        if self.count == 0:
+            return None
+        rank = math.ceil(self.count * p / 100.0)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.max, self._upper_bound(bucket))
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count > 0 else None
+
+
+class IngestionStats:
+    """
+    Statistics of the requests sent by an ingestion: latencies, statuses, retries and body sizes. The statistics of
+    the worker processes are merged into the ones of the run.
+    """
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.statuses = collections.Counter()
+        self.retries = 0
+        self.bytes_raw = 0
+        self.bytes_sent = 0
+        self.concurrency_limit = None
+
+    def record_request(self, status, latency: float):
+        """
+        Count a request, retries included.
+        :param status: the HTTP status of the response, or the name of the error if there was none
+        :param latency: how long the request took in seconds
+        """
+        self.statuses[str(status)] += 1
+        self.latency.record(latency)
+
+    def record_body(self, raw_size: int, sent_size: int):
+        """ Count a request body of raw_size bytes, sent as sent_size bytes once compressed. """
+        self.bytes_raw += raw_size
+        self.bytes_sent += sent_size
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.statuses.update(other.statuses)
+        self.retries += other.retries
+        self.bytes_raw += other.bytes_raw
+        self.bytes_sent += other.bytes_sent
+        if other.concurrency_limit is not None:
+            self.concurrency_limit = (self.concurrency_limit or 0) + other.concurrency_limit
+
+    def report(self, wall_time: float):
+        """ Returns the statistics as a JSON compatible dictionary, given the duration of the ingestion in seconds. """
+        requests = self.latency.count
+        latency = {"mean": self.latency.mean(), "max": self.latency.max if requests > 0 else None}
+        for p in PERCENTILES:
+            latency["p%d" % p] = self.latency.percentile(p)
+        return {
+            "wall_time": wall_time,
+            "requests": requests,
+            "requests_per_second": requests / wall_time if wall_time > 0 else None,
+            "retries": self.retries,
+            "statuses": dict(sorted(self.statuses.items())),
+            "latency": latency,
+            "bytes_raw": self.bytes_raw,
+            "bytes_sent": self.bytes_sent,
+            "concurrency_limit": self.concurrency_limit,
+        }
+
+
+def format_report(report: dict):
+    """ Returns a one line human readable summary of a report of IngestionStats. """
+    latency = report["latency"]
+    if report["requests"] == 0:
+        return "No request sent in {:.1f}s.".format(report["wall_time"])
+    return ("{} requests in {:.1f}s ({:.1f}/s), {} retries, latency p50={:.0f}ms p95={:.0f}ms p99={:.0f}ms, "
+            "statuses {}.").format(report["requests"], report["wall_time"], report["requests_per_second"] or 0,
+                                   report["retries"], latency["p50"] * 1000, latency["p95"] * 1000,
+                                   latency["p99"] * 1000,
+                                   ", ".join("{}: {}".format(k, v) for k, v in report["statuses"].items()))
@@ -0,0 +1,77 @@
+import datetime
+import decimal
+import gzip
+import importlib.util
+
+from nexuscli.helpers import jsonhelper
+
+NDJSON_FORMATS = ("ndjson", "jsonl")
+PARQUET_FORMAT = "parquet"
+
+
+def stream_ndjson_records(file_path: str):
+    """
+    Lazily yield the records of a newline-delimited JSON file (NDJSON or JSON Lines), one JSON object per line.
+    Files ending with '.gz' are decompressed on the fly.
+    :param file_path: the file to read
+    """
+    opener = gzip.open if file_path.endswith(".gz") else open
+    with opener(file_path, "rb") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = jsonhelper.loads(line)
+            except ValueError as e:
+                raise ValueError("Invalid JSON on line %d of %s: %s" % (line_number, file_path, e))
+            if not isinstance(record, dict):
+                raise ValueError("Line %d of %s is not a JSON object" % (line_number, file_path))
+            yield record
+
+
+def _json_compatible(value):
+    """ Convert the values Parquet columns are decoded to which JSON has no representation for. """
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    if isinstance(value, dict):
+        return {k: _json_compatible(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_json_compatible(v) for v in value]
+    return value
+
+
+def parquet_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def stream_parquet_records(file_path: str):
+    """
+    Lazily yield the rows of a Parquet file as dictionaries without their missing values, decoding one row group
+    at a time. Requires pyarrow (pip install nexus-cli[parquet]).
+    :param file_path: the file to read
+    """
+    # imported here as pyarrow is optional and slow to import
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(file_path)
+    for i in range(parquet_file.num_row_groups):
+        table = parquet_file.read_row_group(i)
+        columns = table.to_pydict()
+        names = list(columns)
+        for values in zip(*(columns[name] for name in names)):
+            yield {name: _json_compatible(value) for name, value in zip(names, values) if value is not None}
+
+
+def stream_records(file_path: str, format: str):
+    """ Returns an iterator of the records of a file in one of NDJSON_FORMATS or PARQUET_FORMAT. """
+    if format in NDJSON_FORMATS:
+        return stream_ndjson_records(file_path)
+    if format == PARQUET_FORMAT:
+        return stream_parquet_records(file_path)
+    raise ValueError("Unsupported record format: %s" % format)
@@ -91,11 +91,15 @@ def update(label, _payload, name, description):
 @orgs.command(name='list', help='List all organizations')
 @click.option('_from', '--from', '-f', default=0, help='Offset of the listing')
 @click.option('--size', '-s', default=20, help='How many resource to list')
+@click.option('_all', '--all', is_flag=True, default=False, help='Stream all the results as NDJSON, fetching the next page while the current one is printed (--size is then the page size, at least 100)')
 @click.option('_json', '--json', '-j', is_flag=True, default=False, help='Print JSON payload returned by the nexus API')
 @click.option('--pretty', is_flag=True, default=False, help='Colorize JSON output')
-def _list(_from, size, _json, pretty):
+def _list(_from, size, _all, _json, pretty):
     nxs = utils.get_nexus_client()
     try:
+        if _all:
+            utils.print_all(lambda _from, size: nxs.organizations.list(pagination_from=_from, pagination_size=size), size, _from)
+            return
         response = nxs.organizations.list(pagination_from=_from, pagination_size=size)
         if _json:
             utils.print_json(response, colorize=pretty)
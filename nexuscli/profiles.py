@@ -1,6 +1,5 @@
 import click
 from prettytable import PrettyTable
-import jwt
 from datetime import datetime
 
 from nexuscli.cli import cli
@@ -15,6 +14,9 @@ def profiles():
 
 @profiles.command(name='list', help='List all profiles')
 def list_profiles():
+    # imported here as jwt is slow to import and only needed to show the expiry of the tokens
+    import jwt
+
     config = utils.get_cli_config()
     table = PrettyTable(['Profile', 'Selected', 'URL', 'Token'])
     table.align["Profile"] = "l"
@@ -94,3 +96,33 @@ def delete(profile):
     config.pop(profile, None)
     utils.save_cli_config(config)
     print("Profile deleted.")
+
+
+@profiles.command(name='connection', help='Show or set the connection pool settings of the selected profile')
+@click.option('--limit', type=int, default=None, help='Maximum number of open connections, which caps the --max-connections of the commands, 0 for no limit')
+@click.option('--limit-per-host', type=int, default=None, help='Maximum number of open connections to the same host, 0 for no limit')
+@click.option('--keepalive-timeout', type=float, default=None, help='Seconds an idle connection is kept open for reuse')
+@click.option('--dns-ttl', type=int, default=None, help='Seconds a DNS resolution is cached')
+@click.option('--timeout-total', type=float, default=None, help='Seconds a request may take in total')
+@click.option('--timeout-connect', type=float, default=None, help='Seconds to get a connection and establish it')
+@click.option('--timeout-read', type=float, default=None, help='Seconds to wait for data from the server')
+def connection(limit, limit_per_host, keepalive_timeout, dns_ttl, timeout_total, timeout_connect, timeout_read):
+    settings = {
+        "limit": limit,
+        "limit_per_host": limit_per_host,
+        "keepalive_timeout": keepalive_timeout,
+        "dns_ttl": dns_ttl,
+        "timeout_total": timeout_total,
+        "timeout_connect": timeout_connect,
+        "timeout_read": timeout_read
+    }
+    settings = {k: v for k, v in settings.items() if v is not None}
+    if len(settings) > 0:
+        utils.set_connection_settings(settings)
+        print("Connection settings updated.")
+    table = PrettyTable(['Setting', 'Value'])
+    table.align["Setting"] = "l"
+    table.align["Value"] = "l"
+    for key, value in sorted(utils.get_connection_settings().items()):
+        table.add_row([key, value])
+    print(table)
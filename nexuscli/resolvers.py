@@ -27,7 +27,9 @@ def fetch(id, _org_label, _prj_label, revision, tag, pretty):
     _prj_label = utils.get_project_label(_prj_label)
     nxs = utils.get_nexus_client()
     try:
-        response = nxs.resolvers.fetch(org_label=_org_label, project_label=_prj_label, id=id, rev=revision, tag=tag)
+        response = utils.fetch_cached(
+            lambda: nxs.resolvers.fetch(org_label=_org_label, project_label=_prj_label, id=id, rev=revision),
+            "resolvers", _org_label, _prj_label, id, rev=revision, tag=tag)
         utils.print_json(response, colorize=pretty)
     except nxs.HTTPError as e:
         utils.error(str(e))
@@ -150,14 +152,20 @@ def update(id, _org_label, _prj_label, _projects, _identities, _priority, _resou
 @click.option('--deprecated', '-d', is_flag=True, default=False, help='Show only deprecated resolvers')
 @click.option('_from', '--from', '-f', default=0, help='Offset of the listing')
 @click.option('--size', '-s', default=20, help='How many resolvers to list')
+@click.option('_all', '--all', is_flag=True, default=False, help='Stream all the results as NDJSON, fetching the next page while the current one is printed (--size is then the page size, at least 100)')
 @click.option('_type', '--type', '-t', default=None, help='Filter resolvers by type')
 @click.option('_json', '--json', '-j', is_flag=True, default=False, help='Print JSON payload returned by the nexus API')
 @click.option('--pretty', is_flag=True, default=False, help='Colorize JSON output')
-def _list(_org_label, _prj_label, deprecated, _from, size, _type, _json, pretty):
+def _list(_org_label, _prj_label, deprecated, _from, size, _all, _type, _json, pretty):
     _org_label = utils.get_organization_label(_org_label)
     _prj_label = utils.get_project_label(_prj_label)
     nxs = utils.get_nexus_client()
     try:
+        if _all:
+            utils.print_all(lambda _from, size: nxs.resolvers.list(org_label=_org_label, project_label=_prj_label,
+                                                                   pagination_from=_from, pagination_size=size,
+                                                                   deprecated=deprecated, type=_type), size, _from)
+            return
         response = nxs.resolvers.list(org_label=_org_label, project_label=_prj_label,
                                       pagination_from=_from, pagination_size=size,
                                   deprecated=deprecated, type=_type)
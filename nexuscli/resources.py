@@ -6,6 +6,7 @@ import click
 from prettytable import PrettyTable
 
 from nexuscli import utils
+from nexuscli.helpers import httphelper, streamhelper
 from nexuscli.cli import cli
 
 
@@ -21,17 +22,33 @@ def resources():
 @click.option('--file', '-f', help='Source file to create new resource')
 @click.option('_type', '--type', '-t', default=None, help='Type of resource to load')
 @click.option('_payload', '--data', '-d', help='source payload to create new resource')
-@click.option('--format', default="json", help='Source file extension [json,csv]')
+@click.option('--format', default="json", help='Source file extension [json,csv,ndjson,jsonl,parquet]')
 @click.option('--idcolumn', default=None, help='The column name containing csv row identifier')
 @click.option('--idnamespace', default=None, help='The namespace of the csv entity identifiers: e.g https:doi.org/')
 @click.option('--mergewith', '-m', default=None, multiple=True, help='CSV source file to merge with. Multiple files can be provided')
 @click.option('--aggreg-column', '-a', default=None, multiple=True, help='The columns to aggregate per entity. Multiple columns can be provided')
 @click.option('--mergeon', default=None, help='CSV column name to merge on')
-@click.option('--max-connections', '-c', default=50, help='Maximum number of concurrent connections when loading CSV data')
+@click.option('--project-column', default=None, help="The column (or field) of each row naming the project to create it in, as 'org/project' or 'project' in the selected organization. Rows without one go to the selected project. The column is not sent")
+@click.option('--schema-column', default=None, help='The column (or field) of each row naming the schema to validate it against. Rows without one use --schema. The column is not sent')
+@click.option('--merge-engine', type=click.Choice(['memory', 'disk']), default='memory', help='How to merge CSV files: in memory, or through a temporary on-disk index with bounded memory')
+@click.option('--max-connections', '-c', default=50, help='Maximum number of concurrent connections when loading CSV, NDJSON or Parquet data')
+@click.option('--workers', '-w', default=1, help='Number of processes sharing the load of CSV, NDJSON or Parquet data, each with its share of --max-connections and --max-rps')
+@click.option('--adaptive-concurrency', is_flag=True, default=False, help='Adapt the number of concurrent requests to the latency and error rate of the server when loading CSV, NDJSON or Parquet data, --max-connections is then the upper bound')
+@click.option('--max-rps', default=None, type=float, help='Maximum number of requests per second when loading CSV, NDJSON or Parquet data')
+@click.option('--burst', default=1, help='Number of requests that can be sent at once when --max-rps is set')
+@click.option('--gzip', 'gzip_enabled', is_flag=True, default=False, help='Gzip the request bodies when loading CSV, NDJSON or Parquet data')
+@click.option('--gzip-threshold', default=1024, help='Minimum size in bytes of the request bodies to gzip when --gzip is set')
+@click.option('--max-retries', default=5, help='Maximum number of retries of a row failing with a transient error (429, 5xx, connection error) when loading CSV, NDJSON or Parquet data')
+@click.option('--retry-backoff', default=0.5, help='Base delay in seconds of the exponential backoff between retries when loading CSV, NDJSON or Parquet data')
+@click.option('--resume', is_flag=True, default=False, help='Resume an interrupted load of CSV, NDJSON or Parquet data, skipping the rows recorded in its journal')
+@click.option('--journal', default=None, help='Journal of the rows loaded from the CSV, NDJSON or Parquet data, used by --resume (default: <file name>.journal)')
+@click.option('--upsert', is_flag=True, default=False, help='When loading CSV, NDJSON or Parquet data, update the existing resources that changed and skip the unchanged ones (requires --idcolumn for CSV data)')
+@click.option('--stats-json', default=None, help='File to write the throughput and latency statistics of a load of CSV, NDJSON or Parquet data to, as JSON')
+@click.option('--chunk-size', default=10000, help='Number of CSV rows read at a time when streaming CSV data (not used with --mergewith or --aggreg-column). Duplicated rows are only dropped within a chunk of rows')
 @click.option('--schema', '-s', default='_', help='Schema to validate this resource against')
 @click.option('_json', '--json', '-j', is_flag=True, default=False, help='Print JSON payload returned by the nexus API')
 @click.option('--pretty', is_flag=True, default=False, help='Colorize JSON output')
-def create(_org_label, _prj_label, id, file, _type, _payload, format, idcolumn, idnamespace, mergewith, aggreg_column, mergeon, max_connections, schema, _json, pretty):
+def create(_org_label, _prj_label, id, file, _type, _payload, format, idcolumn, idnamespace, mergewith, aggreg_column, mergeon, project_column, schema_column, merge_engine, max_connections, workers, adaptive_concurrency, max_rps, burst, gzip_enabled, gzip_threshold, max_retries, retry_backoff, resume, journal, upsert, stats_json, chunk_size, schema, _json, pretty):
 
     _org_label = utils.get_organization_label(_org_label)
     _prj_label = utils.get_project_label(_prj_label)
@@ -65,8 +82,21 @@ def create(_org_label, _prj_label, id, file, _type, _payload, format, idcolumn,
                 utils.print_json(response, colorize=pretty)
 
 
+        if file is not None and format in ("csv", "parquet") + streamhelper.NDJSON_FORMATS:
+           if workers < 1:
+               utils.error("--workers must be at least 1.")
+           if max_rps is not None and max_rps <= 0:
+               utils.error("--max-rps must be positive.")
+           rate_limiter = httphelper.create_rate_limiter(max_rps, burst)
+
+        if file is not None and format in ("parquet",) + streamhelper.NDJSON_FORMATS:
+           utils.load_records(_org_label, _prj_label, schema, file_path=file, format=format, _type=_type, id_column=idcolumn, id_namespace=idnamespace, max_connections=max_connections, max_retries=max_retries, retry_backoff=retry_backoff, resume=resume, journal_path=journal, upsert=upsert, adaptive_concurrency=adaptive_concurrency, rate_limiter=rate_limiter, workers=workers, gzip_threshold=gzip_threshold if gzip_enabled else None, stats_path=stats_json, project_column=project_column, schema_column=schema_column)
+           print("Finished loading.")
+
         if file is not None and format == "csv":
-           utils.load_csv(_org_label, _prj_label, schema, file_path=file, merge_with=mergewith, merge_on=mergeon, _type=_type, id_column=idcolumn, id_namespace=idnamespace, aggreg_column=aggreg_column,max_connections=max_connections)
+           if upsert and idcolumn is None:
+               utils.error("--upsert requires --idcolumn.")
+           utils.load_csv(_org_label, _prj_label, schema, file_path=file, merge_with=mergewith, merge_on=mergeon, _type=_type, id_column=idcolumn, id_namespace=idnamespace, aggreg_column=aggreg_column,max_connections=max_connections, chunk_size=chunk_size, max_retries=max_retries, retry_backoff=retry_backoff, resume=resume, journal_path=journal, upsert=upsert, adaptive_concurrency=adaptive_concurrency, rate_limiter=rate_limiter, merge_engine=merge_engine, workers=workers, gzip_threshold=gzip_threshold if gzip_enabled else None, stats_path=stats_json, project_column=project_column, schema_column=schema_column)
            print("Finished loading.")
 
     except nxs.HTTPError as e:
@@ -76,6 +106,62 @@ def create(_org_label, _prj_label, id, file, _type, _payload, format, idcolumn,
 
 
 
+@resources.command(name='replay', help='Send again the resources which failed to be created by a CSV load')
+@click.argument('file', default='errors.ndjson')
+@click.option('--status', multiple=True, help='Only replay the resources which failed with this status code or error name. Multiple statuses can be provided')
+@click.option('_org_label', '--org', '-o', help='Organization to send the resources to instead of the one they failed in')
+@click.option('_prj_label', '--project', '-p', help='Project to send the resources to instead of the one they failed in')
+@click.option('--schema', '-s', default=None, help='Schema to validate the resources against instead of the one they failed with')
+@click.option('--max-connections', '-c', default=50, help='Maximum number of concurrent connections')
+@click.option('--workers', '-w', default=1, help='Number of processes sending the resources, each with its share of --max-connections')
+@click.option('--max-rps', default=None, type=float, help='Maximum number of requests per second')
+@click.option('--burst', default=1, help='Number of requests that can be sent at once when --max-rps is set')
+@click.option('--max-retries', default=5, help='Maximum number of retries of a resource failing with a transient error (429, 5xx, connection error)')
+@click.option('--retry-backoff', default=0.5, help='Base delay in seconds of the exponential backoff between retries')
+@click.option('--gzip', 'gzip_enabled', is_flag=True, default=False, help='Gzip the request bodies')
+@click.option('--gzip-threshold', default=1024, help='Minimum size in bytes of the request bodies to gzip when --gzip is set')
+@click.option('--upsert', is_flag=True, default=False, help='Update the existing resources that changed and skip the unchanged ones')
+def replay(file, status, _org_label, _prj_label, schema, max_connections, workers, max_rps, burst, max_retries, retry_backoff, gzip_enabled, gzip_threshold, upsert):
+    if not os.path.isfile(file):
+        utils.error("The failure log '%s' does not exist." % file)
+    if workers < 1:
+        utils.error("--workers must be at least 1.")
+    if max_rps is not None and max_rps <= 0:
+        utils.error("--max-rps must be positive.")
+    rate_limiter = httphelper.create_rate_limiter(max_rps, burst)
+    utils.replay_failures(file, statuses=set(status), _org_label=_org_label, _prj_label=_prj_label, schema=schema, max_connections=max_connections, max_retries=max_retries, retry_backoff=retry_backoff, upsert=upsert, rate_limiter=rate_limiter, workers=workers, gzip_threshold=gzip_threshold if gzip_enabled else None)
+    print("Finished replaying.")
+
+
+@resources.command(name='export', help='Export the resources of a project to an NDJSON file')
+@click.argument('file')
+@click.option('_org_label', '--org', '-o', help='Organization to work on (overrides selection made via orgs command)')
+@click.option('_prj_label', '--project', '-p', help='Project to work on (overrides selection made via projects command)')
+@click.option('--schema', '-s', default=None, help='Only export the resources validated against this schema')
+@click.option('_type', '--type', '-t', default=None, help='Only export the resources of this type')
+@click.option('--deprecated/--not-deprecated', default=None, help='Only export the deprecated or the not deprecated resources')
+@click.option('--payloads', is_flag=True, default=False, help='Export the full payload of each resource instead of its metadata, fetching them concurrently')
+@click.option('--max-connections', '-c', default=50, help='Maximum number of concurrent connections when fetching the payloads')
+@click.option('--max-rps', default=None, type=float, help='Maximum number of requests per second when fetching the payloads')
+@click.option('--burst', default=1, help='Number of requests that can be sent at once when --max-rps is set')
+@click.option('--max-retries', default=5, help='Maximum number of retries of a payload fetch failing with a transient error (429, 5xx, connection error)')
+@click.option('--retry-backoff', default=0.5, help='Base delay in seconds of the exponential backoff between retries')
+@click.option('--incremental', is_flag=True, default=False, help='Only fetch the resources created or updated since the previous incremental export to the same file, and merge them into it')
+def export(file, _org_label, _prj_label, schema, _type, deprecated, payloads, max_connections, max_rps, burst, max_retries, retry_backoff, incremental):
+    _org_label = utils.get_organization_label(_org_label)
+    _prj_label = utils.get_project_label(_prj_label)
+    if max_rps is not None and max_rps <= 0:
+        utils.error("--max-rps must be positive.")
+    rate_limiter = httphelper.create_rate_limiter(max_rps, burst)
+    nxs = utils.get_nexus_client()
+    try:
+        count = utils.export_resources(_org_label, _prj_label, file, schema=schema, _type=_type, deprecated=deprecated, payloads=payloads, max_connections=max_connections, max_retries=max_retries, retry_backoff=retry_backoff, rate_limiter=rate_limiter, incremental=incremental)
+        print("Exported {} resources to {}.".format(count, file))
+    except nxs.HTTPError as e:
+        utils.print_json(e.response.json(), colorize=True)
+        utils.error(str(e))
+
+
 @resources.command(name='fetch', help='Fetch a resource')
 @click.argument('id')
 @click.option('_org_label', '--org', '-o', help='Organization to work on (overrides selection made via orgs command)')
@@ -89,8 +175,10 @@ def fetch(id, _org_label, _prj_label, schema, revision, tag, pretty):
     _prj_label = utils.get_project_label(_prj_label)
     nxs = utils.get_nexus_client()
     try:
-        response = nxs.resources.fetch(org_label=_org_label, project_label=_prj_label, schema_id=schema,
-                                       resource_id=id, rev=revision, tag=tag)
+        response = utils.fetch_cached(
+            lambda: nxs.resources.fetch(org_label=_org_label, project_label=_prj_label, schema_id=schema,
+                                        resource_id=id, rev=revision),
+            "resources", _org_label, _prj_label, id, rev=revision, tag=tag, schema=schema)
         utils.print_json(response, colorize=pretty)
     except nxs.HTTPError as e:
         utils.print_json(e.response.json(), colorize=True)
@@ -144,14 +232,20 @@ def update(id, _org_label, _prj_label, _payload):
 @click.option('--deprecated', '-d', is_flag=True, default=False, help='Show only deprecated resources')
 @click.option('_from', '--from', '-f', default=0, help='Offset of the listing')
 @click.option('--size', '-s', default=20, help='How many resource to list')
+@click.option('_all', '--all', is_flag=True, default=False, help='Stream all the results as NDJSON, fetching the next page while the current one is printed (--size is then the page size, at least 100)')
 @click.option('_type', '--type', '-t', default=None, help='Filter by type')
 @click.option('_json', '--json', '-j', is_flag=True, default=False, help='Print JSON payload returned by the nexus API')
 @click.option('--pretty', is_flag=True, default=False, help='Colorize JSON output')
-def _list(_org_label, _prj_label, deprecated, _from, size, _type, _json, pretty):
+def _list(_org_label, _prj_label, deprecated, _from, size, _all, _type, _json, pretty):
     _org_label = utils.get_organization_label(_org_label)
     _prj_label = utils.get_project_label(_prj_label)
     nxs = utils.get_nexus_client()
     try:
+        if _all:
+            utils.print_all(lambda _from, size: nxs.resources.list(org_label=_org_label, project_label=_prj_label,
+                                                                   pagination_from=_from, pagination_size=size, type=_type,
+                                                                   deprecated=deprecated), size, _from)
+            return
         response = nxs.resources.list(org_label=_org_label, project_label=_prj_label,
                                       pagination_from=_from, pagination_size=size, type=_type,
                                       deprecated=deprecated)
@@ -3,10 +3,11 @@ from prettytable import PrettyTable
 import json
 import os
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 from nexuscli.cli import cli
 from nexuscli import utils
-from nexuscli.helpers import schemahelper
+from nexuscli.helpers import schemahelper, httphelper
 
 @cli.group()
 def schemas():
@@ -23,9 +24,11 @@ def schemas():
 @click.option('_schemas_base_dir','--schemas-base-dir', '-b', help='Schema namespace to location dictionary')
 @click.option('_schemas_ns','--schemas-ns', '-n', help='Schemas namespace')
 @click.option('_strategy','--strategy', default=schemahelper.UPDATE_IF_DIFFERENT, help='Schemas import strategy:UPDATE_IF_DIFFERENT, UPDATE_IF_EXISTS')
+@click.option('--max-rps', default=None, type=float, help='Maximum number of requests per second when importing a directory of schemas')
+@click.option('--burst', default=1, help='Number of requests that can be sent at once when --max-rps is set')
 @click.option('_json', '--json', '-j', is_flag=True, default=False, help='Print JSON payload returned by the nexus API')
 @click.option('--pretty', is_flag=True, default=False, help='Colorize JSON output')
-def create(_org_label, _prj_label, id, _payload, file, dir,_schemas_base_dir,_schemas_ns,_strategy,_json, pretty):
+def create(_org_label, _prj_label, id, _payload, file, dir,_schemas_base_dir,_schemas_ns,_strategy, max_rps, burst, _json, pretty):
     _org_label = utils.get_organization_label(_org_label)
     _prj_label = utils.get_project_label(_prj_label)
     nxs = utils.get_nexus_client()
@@ -42,7 +45,10 @@ def create(_org_label, _prj_label, id, _payload, file, dir,_schemas_base_dir,_sc
             if _schemas_base_dir:
                 print(_schemas_base_dir)
                 _schemas_base_dir = json.loads(_schemas_base_dir)
-            imported, not_imported = schemahelper.import_schemas(dir, _org_label, _prj_label, _schemas_base_dir, _schemas_ns, _strategy)
+            if max_rps is not None and max_rps <= 0:
+                utils.error("--max-rps must be positive.")
+            rate_limiter = httphelper.create_rate_limiter(max_rps, burst)
+            imported, not_imported = schemahelper.import_schemas(dir, _org_label, _prj_label, _schemas_base_dir, _schemas_ns, _strategy, rate_limiter)
 
             if len(not_imported) > 0:
                 with open("schema-import-errors.log", "w") as file:
@@ -73,8 +79,9 @@ def fetch(id, _org_label, _prj_label, revision, tag, pretty):
     _prj_label = utils.get_project_label(_prj_label)
     nxs = utils.get_nexus_client()
     try:
-        response = nxs.schemas.fetch(org_label=_org_label, project_label=_prj_label, schema_id=id,
-                                     rev=revision, tag=tag)
+        response = utils.fetch_cached(
+            lambda: nxs.schemas.fetch(org_label=_org_label, project_label=_prj_label, schema_id=id, rev=revision),
+            "schemas", _org_label, _prj_label, id, rev=revision, tag=tag)
         utils.print_json(response, colorize=pretty)
     except nxs.HTTPError as e:
         utils.print_json(e.response.json(), colorize=True)
@@ -127,14 +134,21 @@ def update(id, _org_label, _prj_label, _payload):
 @click.option('--deprecated', '-d', is_flag=True, default=False, help='Show only deprecated resources')
 @click.option('_from', '--from', '-f', default=0, help='Offset of the listing')
 @click.option('--size', '-s', default=20, help='How many resource to list')
+@click.option('_all', '--all', is_flag=True, default=False, help='Stream all the results as NDJSON, fetching the next page while the current one is printed (--size is then the page size, at least 100)')
 @click.option('--search', default=None, help='Full text search on the resources')
+@click.option('--max-connections', '-c', default=8, help='Maximum number of schemas fetched at once to show their details')
 @click.option('_json', '--json', '-j', is_flag=True, default=False, help='Print JSON payload returned by the nexus API')
 @click.option('--pretty', is_flag=True, default=False, help='Colorize JSON output')
-def _list(_org_label, _prj_label, deprecated, _from, size, search, _json, pretty):
+def _list(_org_label, _prj_label, deprecated, _from, size, _all, search, max_connections, _json, pretty):
     _org_label = utils.get_organization_label(_org_label)
     _prj_label = utils.get_project_label(_prj_label)
     nxs = utils.get_nexus_client()
     try:
+        if _all:
+            utils.print_all(lambda _from, size: nxs.schemas.list(org_label=_org_label, project_label=_prj_label,
+                                                                 pagination_from=_from, pagination_size=size,
+                                                                 deprecated=deprecated, full_text_search_query=search), size, _from)
+            return
         response = nxs.schemas.list(org_label=_org_label, project_label=_prj_label,
                                     pagination_from=_from, pagination_size=size,
                                     deprecated=deprecated, full_text_search_query=search)
@@ -146,11 +160,20 @@ def _list(_org_label, _prj_label, deprecated, _from, size, search, _json, pretty
             for c in columns:
                 table.align[c] = "l"
 
-            for r in response["_results"]:
-                types = utils.format_json_field(r, "@type")
+            # Get extra info from the schemas themselves, concurrently and from the cache when their revision is known
+            cache = utils.get_content_cache()
+
+            def fetch(r):
+                return utils.fetch_revision(
+                    lambda: nxs.schemas.fetch(org_label=_org_label, project_label=_prj_label, schema_id=r["@id"],
+                                              rev=r["_rev"]),
+                    "schemas", _org_label, _prj_label, r["@id"], r["_rev"], cache=cache)
 
-                # Get extra info from the schema itself
-                schema = nxs.schemas.fetch(org_label=_org_label, project_label=_prj_label, schema_id=r["@id"])
+            with ThreadPoolExecutor(max_workers=max(1, max_connections)) as executor:
+                fetched = list(executor.map(fetch, response["_results"]))
+
+            for r, schema in zip(response["_results"], fetched):
+                types = utils.format_json_field(r, "@type")
                 imports = utils.format_json_field(schema, "imports")
                 node_shapes = get_shapes_id_by_node_kind(schema, ["sh:NodeShape", "NodeShape"])
                 property_shapes = get_shapes_id_by_node_kind(schema, ["sh:PropertyShapes", "PropertyShapes"])
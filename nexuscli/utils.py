@@ -1,27 +1,32 @@
 import asyncio
 import collections
+import gzip
 import hashlib
+import itertools
+import shutil
 import json
+import multiprocessing
 import os
+import queue
 import sys
+import threading
 import time
 from collections import OrderedDict
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import reduce
 from pathlib import Path
 from urllib.parse import quote_plus
 
-import aiohttp
 import nexussdk as nxs
-import pandas as pd
-import progressbar
+import requests
 from colorama import Fore
-from pygments import highlight
-from pygments.formatters import TerminalFormatter
-from pygments.lexers import JsonLdLexer
-import numpy as np
 
 from nexuscli.config import *
+from nexuscli.helpers import cachehelper, confighelper, failurehelper, httphelper, journalhelper, jsonhelper, \
+    listhelper, statshelper, streamhelper
+
+# pandas (through csvhelper), pygments and progressbar are slow to import: they are imported by the functions using
+# them, so that the commands which do not need them start fast (see tests/test_startup.py)
 
 
 def error(message: str):
@@ -43,14 +48,36 @@ def print_json(data: dict, colorize: bool=False):
     :param data: the json payload to print
     :param colorize: if true, colorize the output
     """
-    json_str = json.dumps(data, indent=2)
+    json_str = jsonhelper.dumps_pretty(data)
     if colorize:
+        from pygments import highlight
+        from pygments.formatters import TerminalFormatter
+        from pygments.lexers import JsonLdLexer
+
         sys.stdout.write(highlight(json_str, JsonLdLexer(), TerminalFormatter()))
         sys.stdout.flush()
     else:
         print(json_str)
 
 
+def print_all(list_page, size: int, _from: int=0):
+    """
+    Print all the results of a listing as NDJSON, one result per line, fetching the pages while printing.
+    :param list_page: function returning a page of the listing, called as list_page(_from, size)
+    :param size: the number of results per page, at least listhelper.ALL_PAGE_SIZE
+    :param _from: the offset of the first result
+    """
+    results = listhelper.iter_results(list_page, nxs.utils.http.http_get, max(size, listhelper.ALL_PAGE_SIZE), _from)
+    out = sys.stdout.buffer
+    try:
+        for result in results:
+            out.write(jsonhelper.dumps(result) + b"\n")
+        out.flush()
+    except BrokenPipeError:
+        # the output was closed early, e.g. piped to head: silence the flush of the interpreter on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
 def datetime_from_utc_to_local(utc_datetime: int):
     now_timestamp = time.time()
     offset = datetime.fromtimestamp(now_timestamp) - datetime.utcfromtimestamp(now_timestamp)
@@ -148,6 +175,16 @@ def generate_nexus_payload_checksum(payload: dict, debug: bool=False):
     return checksum
 
 
+def existing_payload_checksum(payload: dict, row: dict):
+    """
+    Returns the checksum of the existing version of a row, comparable to the checksum of the row: Nexus adds its
+    own context to the payloads it returns, which is ignored when the row has no context.
+    """
+    if "@context" not in row:
+        payload = {k: v for k, v in payload.items() if k != "@context"}
+    return generate_nexus_payload_checksum(payload)
+
+
 def format_json_field(payload: dict, field: str):
     formatted = ""
     if field in payload:
@@ -163,17 +200,42 @@ def format_json_field(payload: dict, field: str):
     return formatted
 
 
+DEFAULT_ES_VIEW = "documents"
+# The schema of the resources created without one, '_' in the URLs
+UNCONSTRAINED_SCHEMA = "https://bluebrain.github.io/nexus/schemas/unconstrained.json"
+# In upsert mode, rows are looked up in the default ElasticSearch view by batches of this size
+UPSERT_LOOKUP_VIEW = DEFAULT_ES_VIEW
+UPSERT_LOOKUP_BATCH_SIZE = 100
+# Marks a row whose current version in Nexus must be fetched
+UNKNOWN = object()
+# Resources which could not be fetched by an export are logged like the rows which could not be ingested
+EXPORT_ERRORS_FILE = "export-errors.ndjson"
+# An incremental export starts this long before the previous one did, to cover the clock skew between the CLI
+# and Nexus and the indexing delay of the ElasticSearch view. The resources exported twice are merged anyway.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+# Number of rows sent at once to, and number of results sent at once from, an ingestion worker process
+WORKER_BATCH_SIZE = 500
+
+
 #######################
 # CLI CONFIG
 
+# The config directory is only checked once per process, and its config file only parsed again if it changed
+_cli_config_dir = None
+_cli_config_file = None
+
+
 def get_cli_config_dir():
     """Returns absolute path of CLI config directory, creates it if not found."""
-    home = str(Path.home())
-    cfg_dir = home + '/.nexus-cli'
-    if not os.path.exists(cfg_dir):
-        print("Creating CLI config directory: " + cfg_dir)
-        os.makedirs(cfg_dir)
-    return cfg_dir
+    global _cli_config_dir
+    if _cli_config_dir is None:
+        home = str(Path.home())
+        cfg_dir = home + '/.nexus-cli'
+        if not os.path.exists(cfg_dir):
+            print("Creating CLI config directory: " + cfg_dir)
+            os.makedirs(cfg_dir)
+        _cli_config_dir = cfg_dir
+    return _cli_config_dir
 
 
 def get_cli_config_file():
@@ -181,23 +243,112 @@ def get_cli_config_file():
     return get_cli_config_dir() + '/config.json'
 
 
+def _get_cli_config_file():
+    global _cli_config_file
+    cfg_file = get_cli_config_file()
+    if _cli_config_file is None or _cli_config_file.path != cfg_file:
+        _cli_config_file = confighelper.ConfigFile(cfg_file)
+    return _cli_config_file
+
+
 def get_cli_config():
     """Load CLI config as a dictionary if it exists, if not, return an empty dictionary."""
-    cfg_file = get_cli_config_file()
-    data = {}
-    if not os.path.isfile(cfg_file):
+    data = _get_cli_config_file().load()
+    if data is None:
+        data = {}
         save_cli_config(data)
-    else:
-        with open(cfg_file, 'r') as fp:
-            data = json.load(fp)
     return data
 
 
 def save_cli_config(dict_cfg: dict):
-    """Save the given dictionary in the CLI config directory."""
-    cfg_file = get_cli_config_file()
-    with open(cfg_file, 'w') as fp:
-        json.dump(dict_cfg, fp, sort_keys=True, indent=4)
+    """Atomically save the given dictionary in the CLI config directory."""
+    _get_cli_config_file().save(dict_cfg)
+
+
+def get_content_cache():
+    """Returns the cache of the immutable revisions fetched from Nexus, in the CLI config directory."""
+    return cachehelper.ContentCache(get_cli_config_dir() + '/cache')
+
+
+def _revision_key(cfg: dict, kind: str, org_label: str, project_label: str, id: str, rev: int, schema: str=None):
+    """ Returns the key of a revision in the content cache, which tells apart the paths Nexus would answer 404 to. """
+    return cfg[URL_KEY], kind, org_label, project_label, schema, id, rev
+
+
+def fetch_revision(fetch, kind: str, org_label: str, project_label: str, id: str, rev: int, cache=None,
+                   schema: str=None):
+    """
+    Fetch a revision of a resource, schema, view... through the content cache: revisions never change, so the
+    payload is only fetched from Nexus the first time.
+    :param fetch: function fetching the revision from Nexus, called without arguments
+    :param kind: the first segment of the path of the resource, e.g. resources, schemas or views
+    :param cache: the ContentCache to use, by default the one of get_content_cache()
+    :param schema: the schema of a resource, which is part of its path
+    """
+    if cache is None:
+        cache = get_content_cache()
+    key, cfg = get_selected_deployment_config()
+    cache_key = _revision_key(cfg, kind, org_label, project_label, id, rev, schema)
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = fetch()
+        cache.put(cache_key, payload)
+    return payload
+
+
+def fetch_cached(fetch, kind: str, org_label: str, project_label: str, id: str, rev: int=None, tag: str=None,
+                 schema: str=None):
+    """
+    Fetch a resource, schema, view... through the content cache. A revision never changes so it is only fetched
+    the first time, see fetch_revision. The latest revision and tags can change: they are revalidated with the
+    ETag of the cached copy, which is only downloaded again if it changed, or every time if Nexus returns no ETag.
+    :param fetch: function fetching the given revision from Nexus with the SDK, called without arguments
+    :param kind: the first segment of the path of the resource, e.g. resources, schemas or views
+    :param schema: the schema of a resource, which is part of its path
+    """
+    if rev is not None:
+        return fetch_revision(fetch, kind, org_label, project_label, id, rev, schema=schema)
+    key, cfg = get_selected_deployment_config()
+    segments = [org_label, project_label] + ([schema] if schema is not None else []) + [id]
+    url = cfg[URL_KEY] + "/" + kind + "/" + "/".join(quote_plus(segment) for segment in segments)
+    cache = get_content_cache()
+    cache_key = (url, "tag", tag) if tag is not None else (url, "latest")
+    cached = cache.get(cache_key)
+    headers = nxs.utils.http.prepare_header()
+    if cached is not None:
+        headers["If-None-Match"] = cached["etag"]
+    response = requests.get(url, headers=headers, params={"tag": tag} if tag is not None else None)
+    if response.status_code == 304 and cached is not None:
+        return cached["payload"]
+    response.raise_for_status()
+    payload = json.loads(response.text, object_pairs_hook=OrderedDict)
+    etag = response.headers.get("ETag")
+    if etag is not None:
+        cache.put(cache_key, {"etag": etag, "payload": payload})
+    if "_rev" in payload:
+        revision_key = _revision_key(cfg, kind, org_label, project_label, id, payload["_rev"], schema)
+        if not cache.contains(revision_key):
+            cache.put(revision_key, payload)
+    return payload
+
+
+def get_watermarks_file():
+    """Returns the path of the file storing the watermarks of the incremental exports."""
+    return get_cli_config_dir() + '/watermarks.json'
+
+
+def get_export_watermark(key: str):
+    """Returns the watermark saved for the given key by set_export_watermark, or None."""
+    watermarks = confighelper.ConfigFile(get_watermarks_file()).load() or {}
+    return watermarks.get(key)
+
+
+def set_export_watermark(key: str, watermark: dict):
+    """Atomically save the watermark of an incremental export."""
+    watermarks_file = confighelper.ConfigFile(get_watermarks_file())
+    watermarks = watermarks_file.load() or {}
+    watermarks[key] = watermark
+    watermarks_file.save(watermarks)
 
 
 def get_selected_deployment_config(config: dict=None):
@@ -311,113 +462,833 @@ def set_default_client_id(client_id: str):
     save_cli_config(config)
 
 
-def create_in_nexus(data_model, reader, max_connections):
+def get_connection_settings(cfg: dict=None):
+    """ Returns the connection pool settings of the given (or selected) profile, completed with the defaults. """
+    if cfg is None:
+        key, cfg = get_selected_deployment_config()
+        if cfg is None:
+            error("You must first select a profile using the 'profiles' command")
+    settings = dict(httphelper.DEFAULT_CONNECTION_SETTINGS)
+    settings.update(cfg.get(CONNECTION_KEY, {}))
+    return settings
+
+
+def set_connection_settings(settings: dict):
+    """ Save the given connection pool settings in the selected profile, on top of the ones already set. """
+    config = get_cli_config()
+    profile, selected_config = get_selected_deployment_config(config)
+    if selected_config is None:
+        error("You must first select a profile using the 'profiles' command")
+    config[profile].setdefault(CONNECTION_KEY, {}).update(settings)
+    save_cli_config(config)
+
+
+def _get_cli_version():
+    """ Returns the installed version of nexus-cli, or None if it is not installed. """
+    import pkg_resources
+    try:
+        return pkg_resources.get_distribution("nexus-cli").version
+    except pkg_resources.DistributionNotFound:
+        return None
+
+
+def create_in_nexus(data_model, reader, max_connections, max_retries=5, retry_backoff=0.5, journal=None, upsert=False,
+                    adaptive_concurrency=False, rate_limiter=None, workers=1, gzip_threshold=None, stats_path=None):
+    import progressbar
+
     key, cfg = get_selected_deployment_config()
+    counter = 0
+    skipped = 0
+    outcomes = collections.Counter()
+    failures = []
+    max_value = len(reader) if hasattr(reader, "__len__") else progressbar.UnknownLength
+    bar = progressbar.ProgressBar(max_value=max_value)
+    options = {"max_connections": max_connections, "max_retries": max_retries, "retry_backoff": retry_backoff,
+               "upsert": upsert, "adaptive_concurrency": adaptive_concurrency, "gzip_threshold": gzip_threshold,
+               "resumed": journal is not None and journal.resumed}
+
+    def on_success(offset, outcome):
+        nonlocal counter
+        counter += 1
+        outcomes[outcome] += 1
+        bar.update(counter)
+        if journal is not None:
+            journal.mark_done(offset)
+
+    def on_failure(status, row, body, target):
+        failures.append(failurehelper.failure_record(status, body, row, *target))
+
+    def rows():
+        for offset, row in enumerate(reader):
+            if journal is not None and journal.is_done(offset):
+                nonlocal skipped
+                skipped += 1
+                continue
+            yield offset, row
+
+    started_at = time.monotonic()
+    try:
+        if workers > 1:
+            summaries = _ingest_in_processes(cfg, data_model, rows(), options, workers, rate_limiter, on_success,
+                                             on_failure)
+        else:
+            row_iterator = rows()
+
+            async def next_row():
+                return next(row_iterator, None)
+
+            loop = asyncio.get_event_loop()
+            summaries = [loop.run_until_complete(_ingest(cfg, data_model, next_row, options, rate_limiter,
+                                                         on_success, on_failure))]
+    finally:
+        if journal is not None:
+            journal.close()
+    wall_time = time.monotonic() - started_at
+
+    stats = statshelper.IngestionStats()
+    for summary in summaries:
+        stats.merge(summary)
+    report = stats.report(wall_time)
+    print("\n" + statshelper.format_report(report))
+    if adaptive_concurrency:
+        print("\nAdaptive concurrency ended with {} requests in flight at most.".format(stats.concurrency_limit))
+    if gzip_threshold is not None:
+        print("\nSent {} of JSON as {} with gzip, {} saved.".format(pretty_filesize(stats.bytes_raw),
+                                                                   pretty_filesize(stats.bytes_sent),
+                                                                   pretty_filesize(stats.bytes_raw - stats.bytes_sent)))
+    if stats_path is not None:
+        report["rows"] = {"created": outcomes["created"], "updated": outcomes["updated"],
+                          "unchanged": outcomes["unchanged"], "failed": len(failures), "skipped": skipped}
+        report["deployment"] = cfg[URL_KEY]
+        report["version"] = _get_cli_version()
+        report["options"] = {"max_connections": max_connections, "workers": workers, "upsert": upsert,
+                             "adaptive_concurrency": adaptive_concurrency, "gzip_threshold": gzip_threshold,
+                             "max_rps": rate_limiter.rate if rate_limiter is not None else None}
+        report["finished_at"] = datetime.utcnow().isoformat() + "Z"
+        with open(stats_path, "w") as file:
+            file.write(jsonhelper.dumps_pretty(report) + "\n")
+        print("\nIngestion statistics written to '{}'.".format(stats_path))
+    if skipped > 0:
+        print("\nSkipped {} documents already ingested by a previous run.".format(skipped))
+    if upsert:
+        print("\n{} documents created, {} updated, {} unchanged.".format(outcomes["created"], outcomes["updated"],
+                                                                       outcomes["unchanged"]))
+    return failures
+
+
+def report_failures(failures, file_path=failurehelper.ERRORS_FILE):
+    """ Write the failures returned by create_in_nexus to an NDJSON file and exit if there are any. """
+    if len(failures) > 0:
+        failurehelper.write_failures(file_path, failures)
+        error("\nFailed to ingest {} documents. See '{}' for details, they can be sent again with "
+              "'resources replay'.".format(len(failures), file_path))
+
+
+def _route(row, default_target, project_column=None, schema_column=None):
+    """
+    Returns the (org, project, schema) to write a row to, removing the routing columns from the row.
+    :param default_target: the (org, project, schema) of the rows without a value in the routing columns
+    :param project_column: the optional column of the project, either 'org/project' or a project of the default
+    organization
+    :param schema_column: the optional column of the schema
+    """
+    org, project, schema = default_target
+    if project_column is not None:
+        value = row.pop(project_column, None)
+        if value is not None and value != "":
+            org, _, project = str(value).rpartition("/")
+            org = org or default_target[0]
+    if schema_column is not None:
+        value = row.pop(schema_column, None)
+        if value is not None and value != "":
+            schema = str(value)
+    return org, project, schema
+
+
+async def _ingest(cfg, data_model, next_row, options, rate_limiter, on_success, on_failure):
+    """
+    Write rows to Nexus with a fixed pool of workers fed through a bounded queue.
+    :param cfg: the selected profile
+    :param data_model: where and how to write the rows, see load_csv
+    :param next_row: coroutine function returning the next (offset, row) to write, or None when there is none left
+    :param options: max_connections, max_retries, retry_backoff, upsert, adaptive_concurrency and gzip_threshold,
+    see create_in_nexus
+    :param rate_limiter: an optional TokenBucket every request must go through
+    :param on_success: called with the offset of a row and 'created', 'updated' or 'unchanged' once it is written
+    :param on_failure: called with the status (or error name), the row which could not be written, the body of
+    the last response and the (org, project, schema) the row was written to
+    :return: the IngestionStats of the requests sent, with the final limit of the adaptive concurrency if any
+    """
+    max_connections = options["max_connections"]
+    max_retries = options["max_retries"]
+    retry_backoff = options["retry_backoff"]
+    upsert = options["upsert"]
+    gzip_threshold = options["gzip_threshold"]
+    resumed = options["resumed"]
+    stats = statshelper.IngestionStats()
     env = cfg[URL_KEY]
     headers = {}
     if TOKEN_KEY in cfg:
         headers["Authorization"] = "Bearer {}".format(cfg[TOKEN_KEY])
     headers["Content-Type"] = "application/json"
-
-    org = quote_plus(data_model["_org_label"])
-    project = quote_plus(data_model["_prj_label"])
-    schema = quote_plus(data_model["schema"])
-    path = "resources/" + org + "/" + project + "/" + schema
-    url = env + "/" + path
-    counter = 0
-    failures = []
-    loop = asyncio.get_event_loop()
-    bar = progressbar.ProgressBar(max_value=len(reader))
-
-    async def post(session, url, row):
-        async with session.post(url, data=json.dumps(row)) as response:
-            if response.status == 201:
-                nonlocal counter
-                counter += 1
-                bar.update(counter)
+    headers["Accept-Encoding"] = "gzip, deflate"
+
+    default_target = (data_model["_org_label"], data_model["_prj_label"], data_model["schema"])
+    project_column = data_model.get("project_column")
+    schema_column = data_model.get("schema_column")
+    target_urls = dict()
+    limiter = None
+    if options["adaptive_concurrency"]:
+        # max_connections workers are started but the limiter decides how many requests are in flight
+        limiter = httphelper.AdaptiveLimiter(max_connections)
+
+    def urls(target):
+        """ Returns the URL to create resources in a target, the URL prefix of its resources and its lookup view. """
+        if target not in target_urls:
+            org, project, schema = (quote_plus(part) for part in target)
+            target_urls[target] = (env + "/resources/" + org + "/" + project + "/" + schema,
+                                   env + "/resources/" + org + "/" + project + "/_/",
+                                   env + "/views/" + org + "/" + project + "/" + UPSERT_LOOKUP_VIEW + "/_search")
+        return target_urls[target]
+
+    async def post(client, offset, row, data, target):
+        status, body = await client.request("POST", urls(target)[0], data=data, created_on_conflict=True)
+        if status == 201:
+            on_success(offset, "created")
+        elif status == 409 and resumed:
+            # the interrupted ingestion may have created the row without recording it in the journal yet
+            on_success(offset, "created")
+        else:
+            on_failure(status, row, body, target)
+
+    async def lookup(client, rows, target):
+        """
+        Look up the revision and checksum of the existing version of the given rows in the default
+        ElasticSearch view. Returns a dictionary of id to (revision, checksum), or None if the view is not usable.
+        """
+        rows_by_id = {row["@id"]: row for row in rows if "@id" in row}
+        ids = list(rows_by_id)
+        if len(ids) == 0:
+            return None
+        query = {"size": len(ids), "query": {"terms": {"@id": ids}}}
+        status, body = await client.request("POST", urls(target)[2], data=jsonhelper.dumps(query), read_body=True)
+        if status != 200:
+            return None
+        existing = dict()
+        for hit in body["hits"]["hits"]:
+            source = hit["_source"]
+            if "_original_source" in source:
+                payload = jsonhelper.loads(source["_original_source"])
             else:
-                failures.append((response.status, row))
-
-    async def bound_post(semaphore, session, url, row):
-        async with semaphore:
-            await post(session, url, row)
+                payload = source
+            row = rows_by_id.get(source["@id"], {})
+            existing[source["@id"]] = (source["_rev"], existing_payload_checksum(payload, row))
+        return existing
+
+    async def fetch_existing(client, row, target):
+        """
+        Returns (status, (revision, checksum), body) of the current version of a row in Nexus, where the second
+        element is None if the row was not found and body is only set on errors.
+        """
+        resource_url = urls(target)[1] + quote_plus(row["@id"])
+        status, body = await client.request("GET", resource_url, read_body=True)
+        if status == 200:
+            return status, (body["_rev"], existing_payload_checksum(body, row)), None
+        return status, None, body
+
+    async def upsert_row(client, offset, row, data, existing, from_view, target):
+        """
+        Create, update or skip a row given the (revision, checksum) of its current version in Nexus, or None
+        if it does not exist. What the view returns may be stale, in which case the current version is fetched.
+        """
+        url = urls(target)[0]
+        if existing is None:
+            status, body = await client.request("POST", url, data=data, created_on_conflict=True)
+            if status == 201:
+                on_success(offset, "created")
+                return
+        else:
+            rev, checksum = existing
+            if checksum == generate_nexus_payload_checksum(row):
+                on_success(offset, "unchanged")
+                return
+            resource_url = url + "/" + quote_plus(row["@id"])
+            status, body = await client.request("PUT", resource_url, data=data, params={"rev": rev})
+            if status in (200, 201):
+                on_success(offset, "updated")
+                return
+        if status == 409 and from_view:
+            status, existing, body = await fetch_existing(client, row, target)
+            if status in (200, 404):
+                await upsert_row(client, offset, row, data, existing, from_view=False, target=target)
+                return
+        on_failure(status, row, body, target)
+
+    async def write(client, offset, row, existing, target):
+        # encoded once and reused by the retries
+        data = jsonhelper.dumps(row)
+        if not upsert or "@id" not in row:
+            await post(client, offset, row, data, target)
+        elif existing is not UNKNOWN:
+            await upsert_row(client, offset, row, data, existing, from_view=True, target=target)
+        else:
+            status, existing, body = await fetch_existing(client, row, target)
+            if status in (200, 404):
+                await upsert_row(client, offset, row, data, existing, from_view=False, target=target)
+            else:
+                on_failure(status, row, body, target)
+
+    async def enqueue(queue, client, batch):
+        existing = dict()
+        if upsert:
+            # each project has its own view, so the rows are looked up per target
+            rows_per_target = collections.OrderedDict()
+            for _, row, target in batch:
+                rows_per_target.setdefault(target, []).append(row)
+            for target, rows in rows_per_target.items():
+                existing[target] = await lookup(client, rows, target)
+        for offset, row, target in batch:
+            found = existing.get(target)
+            if found is None:
+                known = UNKNOWN
+            else:
+                known = found.get(row.get("@id"))
+            # blocks while the queue is full so that only a bounded number of rows is held in memory
+            await queue.put((offset, row, known, target))
+
+    async def produce(queue, client, nb_workers):
+        batch = []
+        while True:
+            item = await next_row()
+            if item is None:
+                break
+            offset, row = item
+            if "rdf_type" in data_model:
+                row["@type"] = data_model["rdf_type"]
+            id_namespace = ""
+            if "id_namespace" in data_model:
+                id_namespace = data_model["id_namespace"]
+            elif "rdf_type" in data_model:
+                id_namespace = "".join([data_model["rdf_type"],"_"])
+
+            if "id" in data_model:
+                row["@id"] = "".join([id_namespace,str(row[data_model["id"]])])
+
+            # in upsert mode, rows are looked up in batches before being written
+            batch.append((offset, row, _route(row, default_target, project_column, schema_column)))
+            if len(batch) >= UPSERT_LOOKUP_BATCH_SIZE or not upsert:
+                await enqueue(queue, client, batch)
+                batch = []
+        await enqueue(queue, client, batch)
+        for _ in range(nb_workers):
+            await queue.put(None)
+
+    async def consume(queue, client):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            offset, row, existing, target = item
+            await write(client, offset, row, existing, target)
 
     async def send():
-        futures = []
-        semaphore = asyncio.Semaphore(max_connections)
-        async with aiohttp.ClientSession(headers=headers) as session:
-            for row in reader:
-                if "rdf_type" in data_model:
-                    row["@type"] = data_model["rdf_type"]
-                id_namespace = ""
-                if "id_namespace" in data_model:
-                    id_namespace = data_model["id_namespace"]
-                elif "rdf_type" in data_model:
-                    id_namespace = "".join([data_model["rdf_type"],"_"])
-
-                if "id" in data_model:
-                    row["@id"] = "".join([id_namespace,str(row[data_model["id"]])])
-
-                request = asyncio.ensure_future(bound_post(semaphore, session, url, row))
-                futures.append(request)
-
-            await asyncio.gather(*futures)
-
-    loop.run_until_complete(send())
+        queue = asyncio.Queue(maxsize=2 * max_connections)
+        async with httphelper.create_client_session(get_connection_settings(cfg), headers,
+                                                    limit=max_connections) as session:
+            client = httphelper.RetryingClient(session, stats, max_retries, retry_backoff, rate_limiter, limiter,
+                                               gzip_threshold)
+            tasks = [asyncio.ensure_future(consume(queue, client)) for _ in range(max_connections)]
+            tasks.append(asyncio.ensure_future(produce(queue, client, max_connections)))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    await send()
+    if limiter is not None:
+        stats.concurrency_limit = limiter.limit
+    return stats
+
+
+def _ingest_in_processes(cfg, data_model, rows, options, nb_workers, rate_limiter, on_success, on_failure):
+    """
+    Shard the rows across worker processes, each running _ingest with its own session and share of the
+    connections and of the rate limit. Progress and failures are reported back to the callbacks in this process.
+    :return: the IngestionStats returned by _ingest in the workers
+    """
+    context = multiprocessing.get_context("spawn")
+    inputs = context.Queue(maxsize=2 * nb_workers)
+    results = context.Queue()
+    worker_options = dict(options, max_connections=max(1, options["max_connections"] // nb_workers))
+    worker_rate = None
+    if rate_limiter is not None:
+        worker_rate = (rate_limiter.rate / nb_workers, max(1, int(rate_limiter.capacity // nb_workers)))
+    processes = [context.Process(target=_ingestion_worker, args=(cfg, data_model, worker_options, worker_rate,
+                                                                 inputs, results), daemon=True)
+                 for _ in range(nb_workers)]
+    for process in processes:
+        process.start()
+    summaries = []
+
+    def collect():
+        ended = 0
+        while ended < nb_workers:
+            try:
+                message = results.get(timeout=0.5)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    return
+                continue
+            if message[0] == "done":
+                for offset, outcome in message[1]:
+                    on_success(offset, outcome)
+            elif message[0] == "failure":
+                on_failure(*message[1:])
+            elif message[0] == "end":
+                ended += 1
+                summaries.append(message[1])
+
+    def put(item):
+        while True:
+            try:
+                inputs.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if not any(process.is_alive() for process in processes):
+                    error("\nThe ingestion worker processes stopped unexpectedly.")
+
+    collector = threading.Thread(target=collect, daemon=True)
+    collector.start()
+    try:
+        batch = []
+        for item in rows:
+            batch.append(item)
+            if len(batch) >= WORKER_BATCH_SIZE:
+                put(batch)
+                batch = []
+        if batch:
+            put(batch)
+        for _ in processes:
+            put(None)
+        for process in processes:
+            process.join()
+        collector.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+    if any(process.exitcode != 0 for process in processes):
+        error("\nAn ingestion worker process failed, use --resume to load the remaining documents.")
+    return summaries
+
+
+def _ingestion_worker(cfg, data_model, options, rate, inputs, results):
+    """ Entry point of the worker processes of _ingest_in_processes. """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    rate_limiter = httphelper.create_rate_limiter(*rate) if rate is not None else None
+    pending = []
+    done = []
+    flushed_at = [time.monotonic()]
+
+    def flush():
+        if done:
+            results.put(("done", list(done)))
+            del done[:]
+        flushed_at[0] = time.monotonic()
+
+    def on_success(offset, outcome):
+        done.append((offset, outcome))
+        if len(done) >= WORKER_BATCH_SIZE or time.monotonic() - flushed_at[0] > 0.5:
+            flush()
+
+    def on_failure(status, row, body, target):
+        results.put(("failure", status, row, body, target))
+
+    async def next_row():
+        while not pending:
+            batch = await loop.run_in_executor(None, inputs.get)
+            if batch is None:
+                return None
+            pending.extend(reversed(batch))
+        return pending.pop()
 
-    if len(failures) > 0:
-        with open("errors.log", "w") as file:
-            for (status_code, row) in failures:
-                file.write("code={} body={}\n".format(status_code, row))
-        error("\nFailed to ingest {} documents. See 'errors.log' for details.".format(len(failures)))
+    try:
+        stats = loop.run_until_complete(_ingest(cfg, data_model, next_row, options, rate_limiter, on_success,
+                                                on_failure))
+    finally:
+        flush()
+    results.put(("end", stats))
 
 
 def merge_csv(file_paths, on):
-    dfs = [pd.read_csv(file_path, keep_default_na=False) for file_path in file_paths]
+    import pandas as pd
+    from nexuscli.helpers import csvhelper
+
+    dfs = [csvhelper.read_csv(file_path) for file_path in file_paths]
     df = reduce(lambda x, y: pd.merge(x, y, on=on, how='outer'), dfs)
     return df
 
 
-def load_csv(_org_label, _prj_label, schema, file_path, merge_with=None, merge_on=None, _type=None, id_column=None, id_namespace=None, aggreg_column=None, max_connections=50):
+def _open_journal(file_path, journal_path, fingerprint, resume):
     try:
-        if merge_with:
-            merge_with = list(merge_with)
-            merge_with.append(file_path)
-            reader = merge_csv(merge_with, merge_on)
+        journal = journalhelper.IngestionJournal(journal_path or journalhelper.default_journal_path(file_path),
+                                                 fingerprint, resume=resume)
+    except journalhelper.JournalMismatchException as e:
+        error(str(e))
+    if resume:
+        print("Resuming, {} documents were already ingested.".format(len(journal)))
+    return journal
+
+
+def _data_model(_org_label, _prj_label, schema, _type=None, id_column=None, id_namespace=None, project_column=None,
+                schema_column=None):
+    data_model = dict()
+    if project_column:
+        data_model["project_column"] = project_column
+    if schema_column:
+        data_model["schema_column"] = schema_column
+    if id_column:
+        data_model["id"] = id_column
+    if id_namespace:
+        data_model["id_namespace"] = id_namespace
+    if _type:
+        data_model["rdf_type"] = _type
+    data_model["_org_label"] = _org_label
+    data_model["_prj_label"] = _prj_label
+    data_model["schema"] = schema
+    return data_model
+
+
+def load_csv(_org_label, _prj_label, schema, file_path, merge_with=None, merge_on=None, _type=None, id_column=None, id_namespace=None, aggreg_column=None, max_connections=50, chunk_size=10000, max_retries=5, retry_backoff=0.5, resume=False, journal_path=None, upsert=False, adaptive_concurrency=False, rate_limiter=None, merge_engine="memory", workers=1, gzip_threshold=None, stats_path=None, project_column=None, schema_column=None):
+    import pandas as pd
+    from nexuscli.helpers import csvhelper
+
+    try:
+        file_paths = list(merge_with or []) + [file_path]
+        # rows are identified in the journal by their offset, so it is only valid for the same input and options
+        fingerprint = journalhelper.source_fingerprint(
+            file_paths, merge_on=merge_on, _type=_type, id_column=id_column, id_namespace=id_namespace,
+            aggreg_column=list(aggreg_column or []), chunk_size=chunk_size, merge_engine=merge_engine,
+            org=_org_label, project=_prj_label, schema=schema, project_column=project_column,
+            schema_column=schema_column)
+        journal = _open_journal(file_path, journal_path, fingerprint, resume)
+
+        if merge_with and merge_engine == "disk" and not aggreg_column:
+            # join the files through a temporary on-disk index and stream the joined rows
+            reader = csvhelper.stream_merged_csv_records(file_paths, merge_on, chunk_size)
+            print("Loading resources from {}...".format(", ".join(file_paths)))
+        elif merge_with or aggreg_column:
+            if merge_with and merge_engine == "disk":
+                # the aggregation needs the whole joined table, but the join itself is still done on disk
+                reader = pd.concat(csvhelper.merge_csv_on_disk(file_paths, merge_on, chunk_size), ignore_index=True)
+            elif merge_with:
+                reader = merge_csv(file_paths, merge_on)
+            else:
+                reader = csvhelper.read_csv(file_path)
+
+            reader.drop_duplicates(inplace=True)
+            reader.fillna('')
+
+            if aggreg_column:
+                reader = csvhelper.aggregate(reader, list(aggreg_column))
+
+            reader = csvhelper.frame_to_records(reader)
+            print("Loading {} resources...".format(len(reader)))
         else:
-            reader = pd.read_csv(file_path, keep_default_na=False)
-
-        reader.drop_duplicates(inplace=True)
-        reader.fillna('')
-
-        if aggreg_column:
-            aggreg_column = list(aggreg_column)
-            grouby_columns = [column for column in reader.columns if column not in aggreg_column]
-            reader.fillna("nan",inplace=True)
-            reader_unique = reader.groupby(by=grouby_columns).agg(lambda x: list(x))
-            reader = reader_unique.reset_index()
-
-            for column in reader.columns:
-                m = [v == ['nan'] or v=="nan" for v in reader[column]]
-                reader.loc[m, column] = np.nan
-
-        reader = (reader.apply(lambda x: x.dropna(), axis=1).to_json(orient='records'))
-        reader = json.loads(reader)
-        print("Loading {} resources...".format(len(reader)))
-
-        data_model = dict()
-        if id_column:
-            data_model["id"] = id_column
-        if id_namespace:
-            data_model["id_namespace"] = id_namespace
-        if _type:
-            data_model["rdf_type"] = _type
-        data_model["_org_label"] = _org_label
-        data_model["_prj_label"] = _prj_label
-        data_model["schema"] = schema
-        create_in_nexus(data_model, reader, max_connections)
+            # stream the file so that memory stays bounded and the upload starts as soon as the first chunk is read
+            reader = csvhelper.stream_csv_records(file_path, chunk_size)
+            print("Loading resources from {}...".format(file_path))
+
+        data_model = _data_model(_org_label, _prj_label, schema, _type, id_column, id_namespace, project_column,
+                                 schema_column)
+        failures = create_in_nexus(data_model, reader, max_connections, max_retries=max_retries,
+                                   retry_backoff=retry_backoff, journal=journal, upsert=upsert,
+                                   adaptive_concurrency=adaptive_concurrency, rate_limiter=rate_limiter,
+                                   workers=workers, gzip_threshold=gzip_threshold, stats_path=stats_path)
+        report_failures(failures)
 
     except Exception as e:
         raise Exception from e
 
 
+def load_records(_org_label, _prj_label, schema, file_path, format, _type=None, id_column=None, id_namespace=None,
+                 max_connections=50, max_retries=5, retry_backoff=0.5, resume=False, journal_path=None, upsert=False,
+                 adaptive_concurrency=False, rate_limiter=None, workers=1, gzip_threshold=None, stats_path=None,
+                 project_column=None, schema_column=None):
+    """
+    Load the JSON records of an NDJSON or Parquet file, streaming them straight to the ingestion pipeline.
+    See load_csv for the options.
+    :param format: one of streamhelper.NDJSON_FORMATS or streamhelper.PARQUET_FORMAT
+    """
+    if format == streamhelper.PARQUET_FORMAT and not streamhelper.parquet_available():
+        error("Reading Parquet files requires pyarrow, install it with: pip install nexus-cli[parquet]")
+    fingerprint = journalhelper.source_fingerprint(
+        [file_path], format=format, _type=_type, id_column=id_column, id_namespace=id_namespace,
+        org=_org_label, project=_prj_label, schema=schema, project_column=project_column, schema_column=schema_column)
+    journal = _open_journal(file_path, journal_path, fingerprint, resume)
+    reader = streamhelper.stream_records(file_path, format)
+    print("Loading resources from {}...".format(file_path))
+    data_model = _data_model(_org_label, _prj_label, schema, _type, id_column, id_namespace, project_column,
+                             schema_column)
+    failures = create_in_nexus(data_model, reader, max_connections, max_retries=max_retries,
+                               retry_backoff=retry_backoff, journal=journal, upsert=upsert,
+                               adaptive_concurrency=adaptive_concurrency, rate_limiter=rate_limiter, workers=workers,
+                               gzip_threshold=gzip_threshold, stats_path=stats_path)
+    report_failures(failures)
+
+
+def replay_failures(file_path, statuses=None, _org_label=None, _prj_label=None, schema=None, max_connections=50,
+                    max_retries=5, retry_backoff=0.5, upsert=False, rate_limiter=None, workers=1, gzip_threshold=None):
+    """
+    Send the rows of a failure log again through the ingestion pipeline, streaming the file. The rows are sent to
+    where they failed to be written unless an organization, project or schema is given. The rows which fail again
+    replace the replayed ones in the failure log once the whole file was replayed.
+    :param file_path: the NDJSON file written by report_failures
+    :param statuses: if given, only replay the rows which failed with one of these statuses (or error names)
+    """
+    def target(record):
+        return (_org_label or record["org"], _prj_label or record["project"], schema or record["schema"])
+
+    # a first pass counts the rows per target so that each target is replayed in turn without loading the rows
+    targets = collections.OrderedDict()
+    for record in failurehelper.read_failures(file_path, statuses):
+        key = target(record)
+        targets[key] = targets.get(key, 0) + 1
+    if len(targets) == 0:
+        print("No failure to replay.")
+        return
+
+    failures = []
+    for (org, project, target_schema), count in targets.items():
+        print("Replaying {} documents to {}/{} (schema {})...".format(count, org, project, target_schema))
+        rows = (record["row"] for record in failurehelper.read_failures(file_path, statuses)
+                if target(record) == (org, project, target_schema))
+        data_model = {"_org_label": org, "_prj_label": project, "schema": target_schema}
+        failures.extend(create_in_nexus(data_model, rows, max_connections, max_retries=max_retries,
+                                        retry_backoff=retry_backoff, upsert=upsert, rate_limiter=rate_limiter,
+                                        workers=workers, gzip_threshold=gzip_threshold))
+
+    # the log is updated in place: it keeps the rows which were not replayed and the ones which failed again
+    kept = [record for record in failurehelper.read_failures(file_path)
+            if statuses and str(record["status"]) not in statuses]
+    failurehelper.write_failures(file_path, kept + failures)
+    if len(failures) > 0:
+        error("\nFailed to ingest {} documents again. See '{}' for details.".format(len(failures), file_path))
+
+
+def open_export(file_path: str, mode: str="wb", compressed: bool=None):
+    """ Open an export file, gzip compressed if compressed is true or, by default, if its name ends with '.gz'. """
+    if compressed is None:
+        compressed = file_path.endswith(".gz")
+    if compressed:
+        return gzip.open(file_path, mode, compresslevel=httphelper.GZIP_LEVEL)
+    return open(file_path, mode)
+
+
+def export_resources(_org_label, _prj_label, file_path, schema=None, _type=None, deprecated=None, payloads=False,
+                     max_connections=50, max_retries=5, retry_backoff=0.5, rate_limiter=None, incremental=False):
+    """
+    Stream the resources of a project to an NDJSON file, one resource per line.
+    In incremental mode, a watermark is saved in the CLI config directory for the profile, organization and
+    project. If the previous export was made to the same file with the same filters and payloads option, only the
+    resources created or updated since it started are fetched, from the default ElasticSearch view, and merged into
+    the file. Otherwise, the whole project is exported again.
+    :param file_path: the file to write, gzip compressed if its name ends with '.gz'
+    :param schema: if given, only export the resources validated against this schema
+    :param _type: if given, only export the resources of this type
+    :param deprecated: if given, only export the deprecated (True) or not deprecated (False) resources
+    :param payloads: if true, fetch and export the full payload of each resource instead of its metadata, with
+    max_connections concurrent requests. The resources are then written in the order they are fetched in.
+    :param incremental: if true, export incrementally
+    :return: the number of resources exported, or merged in incremental mode
+    """
+    nxs = get_nexus_client()
+    key, cfg = get_selected_deployment_config()
+    started_at = datetime.utcnow()
+    watermark_key = "/".join([key, _org_label, _prj_label])
+    # an export of payloads and one of metadata are not merged into each other
+    watermark = {"file": os.path.abspath(file_path), "filters": {"schema": schema, "type": _type,
+                                                                   "deprecated": deprecated, "payloads": payloads}}
+    previous = get_export_watermark(watermark_key) if incremental else None
+    delta = previous is not None and os.path.isfile(file_path) and previous["file"] == watermark["file"] \
+        and previous["filters"] == watermark["filters"]
+
+    if delta:
+        print("Exporting the resources updated since {}...".format(previous["updated_at"]))
+        listing = _iter_updated_resources(nxs, _org_label, _prj_label, previous["updated_at"], schema, _type,
+                                          deprecated)
+        output_path = file_path + ".delta"
+    else:
+        def list_page(_from, size):
+            return nxs.resources.list(org_label=_org_label, project_label=_prj_label, pagination_from=_from,
+                                      pagination_size=size, type=_type, deprecated=deprecated, schema=schema)
+
+        listing = listhelper.iter_results(list_page, nxs.utils.http.http_get, listhelper.ALL_PAGE_SIZE)
+        output_path = file_path
+    import progressbar
+
+    bar = progressbar.ProgressBar(max_value=progressbar.UnknownLength)
+    count = 0
+    failures = []
+    with open_export(output_path, compressed=file_path.endswith(".gz")) as out:
+        if not payloads:
+            for resource in listing:
+                out.write(jsonhelper.dumps(resource) + b"\n")
+                count += 1
+                bar.update(count)
+        else:
+            def on_payload(payload):
+                nonlocal count
+                out.write(jsonhelper.dumps(payload) + b"\n")
+                count += 1
+                bar.update(count)
+
+            def on_failure(status, resource, body):
+                failures.append(failurehelper.failure_record(status, body, resource, _org_label, _prj_label,
+                                                             schema or "_"))
+
+            fetch_started_at = time.monotonic()
+            loop = asyncio.get_event_loop()
+            stats = loop.run_until_complete(_fetch_payloads(cfg, listing, max_connections, max_retries,
+                                                            retry_backoff, rate_limiter, on_payload, on_failure))
+            print("\n" + statshelper.format_report(stats.report(time.monotonic() - fetch_started_at)))
+    bar.finish()
+    if len(failures) > 0:
+        failurehelper.write_failures(EXPORT_ERRORS_FILE, failures)
+        if delta:
+            os.remove(output_path)
+        error("\nFailed to fetch {} resources. See '{}' for details.".format(len(failures), EXPORT_ERRORS_FILE))
+    if delta:
+        _merge_export(file_path, output_path)
+    if incremental:
+        # only saved once the export succeeded, so that a failed one is fetched again by the next run
+        watermark["updated_at"] = (started_at - WATERMARK_OVERLAP).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        set_export_watermark(watermark_key, watermark)
+    return count
+
+
+def _iter_updated_resources(nxs, _org_label, _prj_label, since, schema=None, _type=None, deprecated=None):
+    """
+    Lazily yield the metadata of the resources created or updated since a date, in order of update, from the
+    default ElasticSearch view of a project. See export_resources for the filters.
+    :param since: the ISO 8601 date of the oldest update to return
+    """
+    project = None
+    if schema is not None or _type is not None:
+        project = nxs.projects.fetch(org_label=_org_label, project_label=_prj_label)
+    query = _updated_resources_query(project, since, schema, _type, deprecated)
+    while True:
+        hits = nxs.views.query_es(_org_label, _prj_label, query, view_id=DEFAULT_ES_VIEW)["hits"]["hits"]
+        for hit in hits:
+            source = hit["_source"]
+            source.pop("_original_source", None)
+            yield source
+        if len(hits) < listhelper.ALL_PAGE_SIZE:
+            return
+        query["search_after"] = hits[-1]["sort"]
+
+
+def _updated_resources_query(project, since, schema=None, _type=None, deprecated=None):
+    """
+    Returns the ElasticSearch query of the resources updated since a date. The view indexes the schema and types as
+    IRIs, so they are expanded like the listing of the resources does.
+    :param project: the project, used to expand the schema and type
+    """
+    filters = [{"range": {"_updatedAt": {"gte": since}}}]
+    if schema is not None:
+        filters.append({"term": {"_constrainedBy": _expand_iri(schema, project, "base")}})
+    if _type is not None:
+        filters.append({"term": {"@type": _expand_iri(_type, project, "vocab")}})
+    if deprecated is not None:
+        filters.append({"term": {"_deprecated": deprecated}})
+    return {"size": listhelper.ALL_PAGE_SIZE, "query": {"bool": {"filter": filters}},
+            "sort": [{"_updatedAt": "asc"}, {"@id": "asc"}]}
+
+
+def _expand_iri(value, project, namespace):
+    """
+    Expand an id the way Nexus does: a CURIE with the API mappings of the project, '_' as the unconstrained schema
+    and a short name with the base or vocab of the project, given as namespace. Other IRIs are returned unchanged.
+    """
+    if value == "_":
+        return UNCONSTRAINED_SCHEMA
+    prefix, colon, suffix = value.partition(":")
+    if not colon:
+        return project[namespace] + value
+    for mapping in project.get("apiMappings", []):
+        if mapping["prefix"] == prefix:
+            return mapping["namespace"] + suffix
+    return value
+
+
+def _merge_export(file_path, delta_path):
+    """
+    Merge a delta export into a previous export, streaming both: the resources of the delta replace the ones
+    with the same @id and the others are appended. Only the ids of the delta are held in memory.
+    """
+    compressed = file_path.endswith(".gz")
+    with open_export(delta_path, "rb", compressed) as delta:
+        updated_ids = set(jsonhelper.loads(line).get("@id") for line in delta if line.strip())
+    tmp_path = file_path + ".tmp"
+    with open_export(tmp_path, "wb", compressed) as out:
+        with open_export(file_path, "rb", compressed) as previous:
+            for line in previous:
+                if line.strip() and jsonhelper.loads(line).get("@id") not in updated_ids:
+                    out.write(line)
+        with open_export(delta_path, "rb", compressed) as delta:
+            shutil.copyfileobj(delta, out)
+    os.replace(tmp_path, file_path)
+    os.remove(delta_path)
+
+
+async def _fetch_payloads(cfg, listing, max_connections, max_retries, retry_backoff, rate_limiter, on_payload,
+                          on_failure):
+    """
+    Fetch the payloads of the listed resources from their '_self' with a fixed pool of workers fed through a
+    bounded queue. The listing is consumed a page at a time in a background thread.
+    :param listing: an iterator of the metadata of the resources, see listhelper.iter_results
+    :param on_payload: called with each payload fetched
+    :param on_failure: called with the status (or error name), the metadata of the resource and the error body
+    :return: the IngestionStats of the requests sent
+    """
+    loop = asyncio.get_event_loop()
+    stats = statshelper.IngestionStats()
+    headers = {"Accept": "application/ld+json, application/json", "Accept-Encoding": "gzip, deflate"}
+    if TOKEN_KEY in cfg:
+        headers["Authorization"] = "Bearer {}".format(cfg[TOKEN_KEY])
+
+    async def produce(queue):
+        while True:
+            page = await loop.run_in_executor(None, list, itertools.islice(listing, listhelper.ALL_PAGE_SIZE))
+            for resource in page:
+                await queue.put(resource)
+            if len(page) < listhelper.ALL_PAGE_SIZE:
+                break
+        for _ in range(max_connections):
+            await queue.put(None)
+
+    async def consume(queue, client):
+        while True:
+            resource = await queue.get()
+            if resource is None:
+                return
+            status, body = await client.request("GET", resource["_self"], read_body=True)
+            if status == 200:
+                on_payload(body)
+            else:
+                on_failure(status, resource, body)
+
+    queue = asyncio.Queue(maxsize=2 * max_connections)
+    async with httphelper.create_client_session(get_connection_settings(cfg), headers,
+                                                limit=max_connections) as session:
+        client = httphelper.RetryingClient(session, stats, max_retries, retry_backoff, rate_limiter)
+        tasks = [asyncio.ensure_future(consume(queue, client)) for _ in range(max_connections)]
+        tasks.append(asyncio.ensure_future(produce(queue)))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+    return stats
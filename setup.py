@@ -28,6 +28,10 @@ setup(
         'rdflib-jsonld',
         'SPARQLWrapper'
     ],
+    extras_require={
+        'fast': ['orjson'],
+        'parquet': ['pyarrow'],
+    },
     entry_points='''
         [console_scripts]
         nexus=nexuscli.cli:cli
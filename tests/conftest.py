@@ -0,0 +1,126 @@
+import asyncio
+import collections
+import json
+import socket
+import threading
+from urllib.parse import unquote
+
+import pytest
+from aiohttp import web
+
+from nexuscli import utils
+
+NEXUS_CONTEXT = "https://bluebrain.github.io/nexus/contexts/resource.json"
+
+
+class FakeNexus:
+    """
+    Minimal Nexus serving the resources and the default ElasticSearch view of the projects, in a background thread.
+    The resources are kept in memory, by (org, project, id), and every request is counted.
+    """
+
+    def __init__(self):
+        self.resources = dict()
+        self.requests = collections.Counter()
+        self.posts = collections.Counter()
+        self.gzipped = 0
+        # ids always answered with a 400, and whether the view answers the lookups
+        self.invalid_ids = set()
+        self.view_available = True
+        # revisions the view returns instead of the current ones, and ids it does not return yet, to simulate an
+        # outdated index
+        self.stale_revisions = dict()
+        self.unindexed = set()
+        self.url = None
+        self._loop = None
+        self._runner = None
+
+    def _key(self, request, id=None):
+        return (request.match_info["org"], request.match_info["project"],
+                unquote(request.match_info["id"]) if id is None else id)
+
+    async def post(self, request):
+        self.requests["POST"] += 1
+        if request.headers.get("Content-Encoding") == "gzip":
+            self.gzipped += 1
+        payload = json.loads((await request.read()).decode("utf-8"))
+        id = payload.get("@id", "generated-%d" % len(self.resources))
+        self.posts[id] += 1
+        if id in self.invalid_ids:
+            return web.json_response({"@type": "InvalidResource"}, status=400)
+        key = self._key(request, id)
+        if key in self.resources:
+            return web.json_response({"@type": "ResourceAlreadyExists"}, status=409)
+        self.resources[key] = dict(payload, _rev=1)
+        return web.json_response({"@id": id, "_rev": 1}, status=201)
+
+    async def get(self, request):
+        self.requests["GET"] += 1
+        key = self._key(request)
+        if key not in self.resources:
+            return web.json_response({"@type": "NotFound"}, status=404)
+        return web.json_response(dict(self.resources[key], **{"@context": NEXUS_CONTEXT}))
+
+    async def put(self, request):
+        self.requests["PUT"] += 1
+        key = self._key(request)
+        rev = int(request.query["rev"])
+        if key not in self.resources or self.resources[key]["_rev"] != rev:
+            return web.json_response({"@type": "IncorrectRev"}, status=409)
+        payload = json.loads((await request.read()).decode("utf-8"))
+        self.resources[key] = dict(payload, _rev=rev + 1)
+        return web.json_response({"@id": key[2], "_rev": rev + 1}, status=200)
+
+    async def search(self, request):
+        self.requests["SEARCH"] += 1
+        if not self.view_available:
+            return web.json_response({"@type": "NotFound"}, status=404)
+        query = await request.json()
+        ids = set(query["query"]["terms"]["@id"]) - self.unindexed
+        hits = []
+        for (org, project, id), payload in self.resources.items():
+            if (org, project) == (request.match_info["org"], request.match_info["project"]) and id in ids:
+                source = {k: v for k, v in payload.items() if not k.startswith("_")}
+                hits.append({"_source": {"@id": id, "_rev": self.stale_revisions.get(id, payload["_rev"]),
+                                         "_original_source": json.dumps(source)}})
+        return web.json_response({"hits": {"hits": hits}})
+
+    def start(self):
+        app = web.Application()
+        app.router.add_post("/resources/{org}/{project}/{schema}", self.post)
+        app.router.add_get("/resources/{org}/{project}/{schema}/{id}", self.get)
+        app.router.add_put("/resources/{org}/{project}/{schema}/{id}", self.put)
+        app.router.add_post("/views/{org}/{project}/{view}/_search", self.search)
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        self.url = "http://127.0.0.1:%d" % port
+        started = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(app)
+            self._loop.run_until_complete(self._runner.setup())
+            self._loop.run_until_complete(web.TCPSite(self._runner, "127.0.0.1", port).start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+@pytest.fixture
+def nexus(monkeypatch):
+    """ A FakeNexus, selected as the deployment of the CLI. """
+    server = FakeNexus()
+    server.start()
+    monkeypatch.setattr(utils, "get_selected_deployment_config", lambda config=None: ("test", {"url": server.url}))
+    yield server
+    server.stop()
@@ -0,0 +1,42 @@
+import os
+
+from nexuscli.helpers import cachehelper
+
+
+def test_content_cache(tmpdir):
+    cache = cachehelper.ContentCache(str(tmpdir))
+    key = ("https://nexus", "org", "project", "https://schema", 3)
+    assert cache.get(key) is None
+    cache.put(key, {"@id": "https://schema", "_rev": 3})
+    assert cache.get(key) == {"@id": "https://schema", "_rev": 3}
+    assert cache.get(key[:-1] + (4,)) is None
+
+
+def test_corrupted_cache_entry(tmpdir):
+    cache = cachehelper.ContentCache(str(tmpdir))
+    key = ("https://nexus", "org", "project", "id", 1)
+    cache.put(key, {"@id": "id"})
+    with open(cache._path(key), "wb") as f:
+        f.write(b"not gzip")
+    assert cache.get(key) is None
+    assert cache.get(key) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmpdir):
+    cache = cachehelper.ContentCache(str(tmpdir))
+    keys = [("https://nexus", "org", "project", "id", rev) for rev in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, {"@id": "id", "_rev": key[-1]})
+        os.utime(cache._path(key), (i, i))
+    cache.get(keys[0])
+    sizes = sum(os.path.getsize(cache._path(key)) for key in keys)
+    cache.max_size = sizes - 1
+    # the size is only checked every EVICTION_INTERVAL writes
+    cache._writes = 0
+    cache.put(keys[2], {"@id": "id", "_rev": 2})
+    assert all(cache.contains(key) for key in keys)
+    cache._writes = cachehelper.EVICTION_INTERVAL - 1
+    cache.put(keys[2], {"@id": "id", "_rev": 2})
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
@@ -0,0 +1,50 @@
+import json
+import os
+import threading
+
+from nexuscli.helpers import confighelper
+
+
+def test_config_file(tmpdir):
+    config_file = confighelper.ConfigFile(str(tmpdir.join("config.json")))
+    assert config_file.load() is None
+    config_file.save({"foo": {"url": "https://nexus", "selected": True}})
+    config = config_file.load()
+    assert config == {"foo": {"url": "https://nexus", "selected": True}}
+    # the loaded config is a copy which can be modified without saving it
+    config["foo"]["selected"] = False
+    assert config_file.load()["foo"]["selected"] is True
+    assert not os.path.exists(config_file.path + ".tmp")
+
+
+def test_config_file_is_parsed_once(tmpdir, monkeypatch):
+    config_file = confighelper.ConfigFile(str(tmpdir.join("config.json")))
+    config_file.save({"foo": {}})
+    loads = []
+    load = json.load
+    monkeypatch.setattr(json, "load", lambda fp: loads.append(fp) or load(fp))
+    assert config_file.load() == {"foo": {}}
+    assert config_file.load() == {"foo": {}}
+    assert loads == []
+    # written by another process
+    other = confighelper.ConfigFile(config_file.path)
+    other.save({"bar": {}})
+    assert config_file.load() == {"bar": {}}
+    assert len(loads) == 1
+
+
+def test_concurrent_saves(tmpdir):
+    path = str(tmpdir.join("config.json"))
+    configs = [{"profile%d" % i: {"url": "https://nexus%d" % i, "token": "t" * 100000}} for i in range(4)]
+
+    def save(config):
+        for _ in range(5):
+            confighelper.ConfigFile(path).save(config)
+
+    threads = [threading.Thread(target=save, args=(config,)) for config in configs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert confighelper.ConfigFile(path).load() in configs
+    assert tmpdir.listdir() == [tmpdir.join("config.json")]
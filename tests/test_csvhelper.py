@@ -0,0 +1,112 @@
+from nexuscli.helpers import csvhelper
+
+
+def write_csv(tmpdir, name, content):
+    path = tmpdir.join(name)
+    path.write(content)
+    return str(path)
+
+
+def test_stream_csv_records(tmpdir):
+    file_path = write_csv(tmpdir, "data.csv", "id,name,age\n1,foo,12\n2,bar,\n3,baz,\n")
+    records = list(csvhelper.stream_csv_records(file_path, chunk_size=2))
+    assert records == [
+        {"id": 1, "name": "foo", "age": "12"},
+        {"id": 2, "name": "bar", "age": ""},
+        {"id": 3, "name": "baz", "age": ""},
+    ]
+
+
+def test_stream_csv_records_is_lazy(tmpdir):
+    file_path = write_csv(tmpdir, "data.csv", "id\n1\n2\n3\n")
+    records = csvhelper.stream_csv_records(file_path, chunk_size=1)
+    assert next(records) == {"id": 1}
+
+
+def test_aggregate(tmpdir):
+    file_path = write_csv(tmpdir, "data.csv", "id,name,tag\n1,foo,a\n2,bar,b\n1,foo,c\n3,baz,\n")
+    df = csvhelper.aggregate(csvhelper.read_csv(file_path), ["tag"])
+    assert csvhelper.frame_to_records(df) == [
+        {"id": 1, "name": "foo", "tag": ["a", "c"]},
+        {"id": 2, "name": "bar", "tag": ["b"]},
+        {"id": 3, "name": "baz", "tag": [""]},
+    ]
+
+
+def test_aggregate_leaves_out_missing_values(tmpdir):
+    left = csvhelper.read_csv(write_csv(tmpdir, "left.csv", "id,name\n1,foo\n2,bar\n"))
+    right = csvhelper.read_csv(write_csv(tmpdir, "right.csv", "id,tag\n1,a\n1,b\n"))
+    df = csvhelper.aggregate(left.merge(right, on="id", how="outer"), ["tag"])
+    assert csvhelper.frame_to_records(df) == [
+        {"id": 1, "name": "foo", "tag": ["a", "b"]},
+        {"id": 2, "name": "bar"},
+    ]
+
+
+def test_merge_csv_on_disk(tmpdir):
+    file_paths = [
+        write_csv(tmpdir, "a.csv", "id,name\n1,foo\n2,bar\n"),
+        write_csv(tmpdir, "b.csv", "id,name,age\n1,x,10\n1,y,11\n3,z,12\n"),
+    ]
+    records = list(csvhelper.stream_merged_csv_records(file_paths, "id", chunk_size=2))
+    assert records == [
+        {"id": 1, "name_x": "foo", "name_y": "x", "age": 10},
+        {"id": 1, "name_x": "foo", "name_y": "y", "age": 11},
+        {"id": 2, "name_x": "bar"},
+        {"id": 3, "name_y": "z", "age": 12},
+    ]
+
+
+def test_merged_column_names():
+    names = csvhelper.merged_column_names([["id", "name"], ["id", "name", "age"], ["id", "name"]], "id")
+    assert names == [["id", "name_x"], ["id", "name_y", "age"], ["id", "name"]]
+
+
+def test_stream_csv_records_types_do_not_depend_on_chunks(tmpdir):
+    file_path = write_csv(tmpdir, "data.csv", "id,score,ratio,flag\n1,2,2,True\n2,3,3,False\n3,1.5,1.5,False\n4,,0.5,\n")
+    expected = csvhelper.frame_to_records(csvhelper.read_csv(file_path))
+    assert expected[0] == {"id": 1, "score": "2", "ratio": 2.0, "flag": "True"}
+    for chunk_size in (1, 2, 3, 10):
+        assert list(csvhelper.stream_csv_records(file_path, chunk_size)) == expected
+
+
+def test_merge_dtypes():
+    assert csvhelper.merge_dtypes({"i"}) == "int64"
+    assert csvhelper.merge_dtypes({"i", "f"}) == "float64"
+    assert csvhelper.merge_dtypes({"b"}) == "bool"
+    assert csvhelper.merge_dtypes({"b", "O"}) is str
+    assert csvhelper.merge_dtypes({"i", "O"}) is str
+
+
+def test_merge_csv_on_disk_bool_column_with_blank(tmpdir):
+    file_paths = [
+        write_csv(tmpdir, "a.csv", "id,flag\n1,True\n2,False\n3,False\n4,\n"),
+        write_csv(tmpdir, "b.csv", "id,name\n1,foo\n"),
+    ]
+    for chunk_size in (2, 100):
+        records = list(csvhelper.stream_merged_csv_records(file_paths, "id", chunk_size=chunk_size))
+        assert [record["flag"] for record in records] == ["True", "False", "False", ""]
+
+
+def test_merge_csv_on_disk_bool_column(tmpdir):
+    file_paths = [
+        write_csv(tmpdir, "a.csv", "id,flag\n1,True\n2,False\n3,False\n"),
+        write_csv(tmpdir, "b.csv", "id,name\n1,foo\n"),
+    ]
+    records = list(csvhelper.stream_merged_csv_records(file_paths, "id", chunk_size=2))
+    assert [record["flag"] for record in records] == [True, False, False]
+
+
+def test_merge_csv_on_disk_join_column_with_blank(tmpdir):
+    file_paths = [
+        write_csv(tmpdir, "a.csv", "id,name\n1,foo\n2,bar\n3,baz\n,none\n"),
+        write_csv(tmpdir, "b.csv", "id,age\n1,10\n2,11\n3,12\n"),
+    ]
+    for chunk_size in (2, 100):
+        records = list(csvhelper.stream_merged_csv_records(file_paths, "id", chunk_size=chunk_size))
+        assert records == [
+            {"id": "", "name": "none"},
+            {"id": "1", "name": "foo", "age": 10},
+            {"id": "2", "name": "bar", "age": 11},
+            {"id": "3", "name": "baz", "age": 12},
+        ]
@@ -0,0 +1,51 @@
+import json
+
+from nexuscli import utils
+
+
+def write_export(path, resources):
+    with utils.open_export(path) as f:
+        for resource in resources:
+            f.write(json.dumps(resource).encode("utf-8") + b"\n")
+
+
+def read_export(path):
+    with utils.open_export(path, "rb") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_merge_export(tmpdir):
+    path = str(tmpdir.join("export.ndjson.gz"))
+    delta_path = path + ".delta"
+    write_export(path, [{"@id": "a", "_rev": 1}, {"@id": "b", "_rev": 1}, {"@id": "c", "_rev": 1}])
+    with utils.open_export(delta_path, compressed=True) as f:
+        f.write(b'{"@id": "b", "_rev": 2}\n{"@id": "d", "_rev": 1}\n')
+
+    utils._merge_export(path, delta_path)
+    assert read_export(path) == [{"@id": "a", "_rev": 1}, {"@id": "c", "_rev": 1}, {"@id": "b", "_rev": 2},
+                                 {"@id": "d", "_rev": 1}]
+    assert not tmpdir.join("export.ndjson.gz.delta").exists()
+
+
+def test_updated_resources_query_expands_ids():
+    project = {"base": "https://nexus/data/", "vocab": "https://nexus/vocab/",
+               "apiMappings": [{"prefix": "schemas", "namespace": "https://nexus/schemas/"},
+                               {"prefix": "nsg", "namespace": "https://neuroshapes.org/"}]}
+    query = utils._updated_resources_query(project, "2020-01-01T00:00:00Z", "schemas:person", "nsg:Subject", False)
+    assert query["query"]["bool"]["filter"] == [
+        {"range": {"_updatedAt": {"gte": "2020-01-01T00:00:00Z"}}},
+        {"term": {"_constrainedBy": "https://nexus/schemas/person"}},
+        {"term": {"@type": "https://neuroshapes.org/Subject"}},
+        {"term": {"_deprecated": False}}]
+
+    def filters(schema, _type):
+        query = utils._updated_resources_query(project, "2020-01-01T00:00:00Z", schema, _type)
+        return query["query"]["bool"]["filter"][1:]
+
+    assert filters("person", "Subject") == [{"term": {"_constrainedBy": "https://nexus/data/person"}},
+                                            {"term": {"@type": "https://nexus/vocab/Subject"}}]
+    assert filters("https://example.org/person", "http://schema.org/Person") == [
+        {"term": {"_constrainedBy": "https://example.org/person"}}, {"term": {"@type": "http://schema.org/Person"}}]
+    assert filters("_", None) == [{"term": {"_constrainedBy": utils.UNCONSTRAINED_SCHEMA}}]
+    assert utils._updated_resources_query(None, "2020-01-01T00:00:00Z")["query"]["bool"]["filter"] == [
+        {"range": {"_updatedAt": {"gte": "2020-01-01T00:00:00Z"}}}]
@@ -0,0 +1,15 @@
+from nexuscli.helpers import failurehelper
+
+
+def test_failure_log_round_trip(tmpdir):
+    path = str(tmpdir.join("errors.ndjson"))
+    target = ("org", "project", "_")
+    records = [failurehelper.failure_record(409, {"@type": "ResourceAlreadyExists"}, {"@id": "a"}, *target),
+               failurehelper.failure_record(503, "Service Unavailable", {"@id": "b"}, *target),
+               failurehelper.failure_record("ClientConnectorError", None, {"@id": "c"}, *target)]
+    failurehelper.write_failures(path, records)
+
+    assert list(failurehelper.read_failures(path)) == records
+    replayed = failurehelper.read_failures(path, statuses={"503", "ClientConnectorError"})
+    assert [record["row"]["@id"] for record in replayed] == ["b", "c"]
+    assert records[0]["org"] == "org" and records[0]["body"] == {"@type": "ResourceAlreadyExists"}
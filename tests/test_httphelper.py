@@ -0,0 +1,118 @@
+import asyncio
+import gzip
+
+from nexuscli.helpers import httphelper, statshelper
+
+
+def test_parse_retry_after():
+    assert httphelper.parse_retry_after(None) is None
+    assert httphelper.parse_retry_after("120") == 120.0
+    assert httphelper.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert httphelper.parse_retry_after("soon") is None
+
+
+def test_backoff_delay():
+    for attempt in range(10):
+        delay = httphelper.backoff_delay(attempt, base=0.5)
+        assert 0 <= delay <= min(httphelper.MAX_BACKOFF_DELAY, 0.5 * 2 ** attempt)
+    assert httphelper.backoff_delay(0, base=0.5, retry_after=3) >= 3
+
+
+def test_is_retryable_status():
+    assert httphelper.is_retryable_status(429)
+    assert httphelper.is_retryable_status(503)
+    assert not httphelper.is_retryable_status(400)
+    assert not httphelper.is_retryable_status(409)
+
+
+def test_adaptive_limiter():
+    limiter = httphelper.AdaptiveLimiter(max_limit=10, initial_limit=4)
+    for _ in range(20):
+        limiter.in_flight += 1
+        limiter.release(0.1, overloaded=False)
+    assert limiter.limit == 5
+
+    for _ in range(20):
+        limiter.in_flight += 1
+        limiter.release(0.1, overloaded=True)
+    assert limiter.limit == 3
+
+    for _ in range(20):
+        limiter.in_flight += 1
+        limiter.release(1.0, overloaded=False)
+    assert limiter.limit == 2
+
+
+def test_token_bucket():
+    bucket = httphelper.TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.09 < bucket.reserve() <= 0.1
+    assert 0.19 < bucket.reserve() <= 0.2
+    assert httphelper.create_rate_limiter(None) is None
+
+
+def test_connection_limit():
+    assert httphelper.connection_limit({"limit": 100}, 50) == 50
+    assert httphelper.connection_limit({"limit": 10}, 50) == 10
+    assert httphelper.connection_limit({"limit": 0}, 50) == 50
+    assert httphelper.connection_limit({"limit": 10}) == 10
+
+
+def test_compress_body():
+    data = b'{"name": "' + b"a" * 2000 + b'"}'
+    assert httphelper.compress_body(data, threshold=len(data) + 1) == (data, None)
+    body, headers = httphelper.compress_body(data, threshold=1024)
+    assert headers == {"Content-Encoding": "gzip"}
+    assert len(body) < len(data)
+    assert gzip.decompress(body) == data
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self.headers = {"Retry-After": "0"}
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def text(self):
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def request(self, method, url, data=None, params=None, headers=None):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return FakeResponse(*response)
+
+
+def test_retrying_client():
+    stats = statshelper.IngestionStats()
+    client = httphelper.RetryingClient(FakeSession([(503, ""), (409, '{"reason": "exists"}')]), stats,
+                                       max_retries=1, retry_backoff=0)
+    status, body = asyncio.get_event_loop().run_until_complete(client.request("POST", "http://nexus", data=b"{}"))
+    assert (status, body) == (409, {"reason": "exists"})
+    assert stats.retries == 1
+    assert stats.statuses == {"503": 1, "409": 1}
+    assert stats.bytes_raw == 2
+
+
+def test_retrying_client_conflict_after_timeout():
+    stats = statshelper.IngestionStats()
+    client = httphelper.RetryingClient(FakeSession([asyncio.TimeoutError(), (409, '{"reason": "exists"}')]), stats,
+                                       max_retries=1, retry_backoff=0)
+    request = client.request("POST", "http://nexus", data=b"{}", created_on_conflict=True)
+    assert asyncio.get_event_loop().run_until_complete(request) == (201, None)
+    # a conflict following a response which was not processed is a real one
+    client.session = FakeSession([(503, ""), (409, '{"reason": "exists"}')])
+    request = client.request("POST", "http://nexus", data=b"{}", created_on_conflict=True)
+    assert asyncio.get_event_loop().run_until_complete(request) == (409, {"reason": "exists"})
@@ -0,0 +1,98 @@
+import json
+
+from nexuscli import utils
+from nexuscli.helpers import failurehelper, journalhelper
+
+
+def rows(nb_rows):
+    return [{"@id": "http://example.org/%d" % i, "name": "n%d" % i} for i in range(nb_rows)]
+
+
+def data_model():
+    return utils._data_model("org", "project", "_", _type="Person")
+
+
+def test_conflict_is_created_when_resuming(nexus, tmpdir):
+    path = str(tmpdir.join("data.csv.journal"))
+    assert utils.create_in_nexus(data_model(), rows(3), 4) == []
+    # the interrupted ingestion created 3 rows but only the first one was recorded in the journal
+    journal = journalhelper.IngestionJournal(path, {})
+    assert not journal.resumed
+    journal.mark_done(0)
+    journal.close()
+
+    journal = journalhelper.IngestionJournal(path, {}, resume=True)
+    assert journal.resumed
+    assert utils.create_in_nexus(data_model(), rows(5), 4, journal=journal) == []
+    assert nexus.posts["http://example.org/0"] == 1
+    assert nexus.posts["http://example.org/2"] == 2
+    assert len(nexus.resources) == 5
+    journal = journalhelper.IngestionJournal(path, {}, resume=True)
+    journal.close()
+    assert len(journal) == 5
+
+
+def test_conflict_is_a_failure_without_resuming(nexus):
+    assert utils.create_in_nexus(data_model(), rows(2), 4) == []
+    failures = utils.create_in_nexus(data_model(), rows(3), 4)
+    assert sorted(failure["status"] for failure in failures) == [409, 409]
+    assert len(nexus.resources) == 3
+
+
+def test_ingest_in_processes(nexus, tmpdir):
+    stats_path = str(tmpdir.join("stats.json"))
+    nexus.invalid_ids = {"http://example.org/10", "http://example.org/900"}
+    # several batches of rows, shared by the worker processes
+    failures = utils.create_in_nexus(data_model(), rows(2 * utils.WORKER_BATCH_SIZE + 100), 8, max_retries=0,
+                                     workers=2, stats_path=stats_path)
+
+    assert sorted(failure["row"]["@id"] for failure in failures) == ["http://example.org/10",
+                                                                     "http://example.org/900"]
+    assert all(failure["status"] == 400 and failure["project"] == "project" for failure in failures)
+    assert len(nexus.resources) == 2 * utils.WORKER_BATCH_SIZE + 98
+    assert set(nexus.posts.values()) == {1}
+    with open(stats_path) as f:
+        report = json.load(f)
+    assert report["requests"] == 2 * utils.WORKER_BATCH_SIZE + 100
+    assert report["statuses"] == {"201": 2 * utils.WORKER_BATCH_SIZE + 98, "400": 2}
+    assert report["rows"]["created"] == 2 * utils.WORKER_BATCH_SIZE + 98
+    assert report["rows"]["failed"] == 2
+
+
+def test_route():
+    default_target = ("org", "project", "_")
+    row = {"@id": "1", "project": "other/prj", "schema": "person"}
+    assert utils._route(row, default_target, "project", "schema") == ("other", "prj", "person")
+    assert row == {"@id": "1"}
+    # a project of the default organization
+    row = {"@id": "1", "project": "prj"}
+    assert utils._route(row, default_target, "project", "schema") == ("org", "prj", "_")
+    assert row == {"@id": "1"}
+    # empty values and the columns of a row without routing columns
+    row = {"@id": "1", "project": "", "schema": None}
+    assert utils._route(row, default_target, "project", "schema") == default_target
+    assert row == {"@id": "1"}
+    row = {"@id": "1", "project": "other/prj", "schema": "person"}
+    assert utils._route(row, default_target) == default_target
+    assert row == {"@id": "1", "project": "other/prj", "schema": "person"}
+
+
+def test_ingest_routed_rows(nexus):
+    routed = [{"@id": "http://example.org/0", "project": "other/prj"}, {"@id": "http://example.org/1", "project": ""},
+              {"@id": "http://example.org/2", "project": "prj"}]
+    model = utils._data_model("org", "project", "_", project_column="project")
+    assert utils.create_in_nexus(model, routed, 4) == []
+    assert sorted(nexus.resources) == [("org", "prj", "http://example.org/2"),
+                                       ("org", "project", "http://example.org/1"),
+                                       ("other", "prj", "http://example.org/0")]
+    assert all("project" not in payload for payload in nexus.resources.values())
+
+
+def test_replay_with_gzip(nexus, tmpdir):
+    path = str(tmpdir.join("errors.ndjson"))
+    failurehelper.write_failures(path, [failurehelper.failure_record(500, None, row, "org", "project", "_")
+                                        for row in rows(3)])
+    utils.replay_failures(path, gzip_threshold=0)
+    assert len(nexus.resources) == 3
+    assert nexus.gzipped == 3
+    assert list(failurehelper.read_failures(path)) == []
@@ -0,0 +1,38 @@
+import pytest
+
+from nexuscli.helpers import journalhelper
+
+
+def test_resume_journal(tmpdir):
+    path = str(tmpdir.join("data.csv.journal"))
+    fingerprint = {"files": [], "options": {"chunk_size": 10}}
+
+    journal = journalhelper.IngestionJournal(path, fingerprint)
+    for offset in [0, 2, 1, 5]:
+        journal.mark_done(offset)
+    journal.close()
+
+    journal = journalhelper.IngestionJournal(path, fingerprint, resume=True)
+    journal.close()
+    assert len(journal) == 4
+    assert [offset for offset in range(7) if not journal.is_done(offset)] == [3, 4, 6]
+    with open(path) as f:
+        assert f.read().splitlines()[1:] == ["w 3", "5"]
+
+
+def test_journal_is_truncated_unless_resuming(tmpdir):
+    path = str(tmpdir.join("data.csv.journal"))
+    journal = journalhelper.IngestionJournal(path, {})
+    journal.mark_done(0)
+    journal.close()
+
+    journal = journalhelper.IngestionJournal(path, {})
+    journal.close()
+    assert not journal.is_done(0)
+
+
+def test_resume_journal_of_another_source(tmpdir):
+    path = str(tmpdir.join("data.csv.journal"))
+    journalhelper.IngestionJournal(path, {"files": ["a.csv"]}).close()
+    with pytest.raises(journalhelper.JournalMismatchException):
+        journalhelper.IngestionJournal(path, {"files": ["b.csv"]}, resume=True)
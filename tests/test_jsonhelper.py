@@ -0,0 +1,23 @@
+import json
+
+from nexuscli.helpers import jsonhelper
+
+
+def test_dumps():
+    data = {"@id": "foo", "name": "café", "values": [1, 2.5, None, True]}
+    assert json.loads(jsonhelper.dumps(data).decode("utf-8")) == data
+    assert json.loads(jsonhelper.dumps_pretty(data)) == data
+    assert jsonhelper.loads(jsonhelper.dumps(data)) == data
+
+
+def test_dumps_falls_back_to_the_standard_library():
+    data = {1: "non string key", "big": 2 ** 70}
+    assert json.loads(jsonhelper.dumps(data).decode("utf-8")) == {"1": "non string key", "big": 2 ** 70}
+
+
+def test_loads_keeps_integers_larger_than_64_bits():
+    text = '{"a": 123456789012345678901234567890, "b": -9223372036854775809, "c": 1.5, "d": "12345678901234567890"}'
+    expected = {"a": 123456789012345678901234567890, "b": -9223372036854775809, "c": 1.5, "d": "12345678901234567890"}
+    assert jsonhelper.loads(text) == expected
+    assert jsonhelper.loads(text.encode("utf-8")) == expected
+    assert jsonhelper.loads('[18446744073709551615]') == [18446744073709551615]
@@ -0,0 +1,29 @@
+from nexuscli.helpers import listhelper
+
+ITEMS = list(range(25))
+
+
+def list_page(_from, size):
+    return {"_total": len(ITEMS), "_results": ITEMS[_from:_from + size]}
+
+
+def test_iter_results_by_offset():
+    assert list(listhelper.iter_results(list_page, None, size=10)) == ITEMS
+    assert list(listhelper.iter_results(list_page, None, size=10, _from=20)) == ITEMS[20:]
+
+
+def test_iter_results_following_next_links():
+    def page_with_next(_from, size):
+        page = list_page(_from, size)
+        if _from + size < len(ITEMS):
+            page["_next"] = _from + size
+        return page
+
+    fetched = []
+
+    def fetch_next(url):
+        fetched.append(url)
+        return page_with_next(url, 10)
+
+    assert list(listhelper.iter_results(page_with_next, fetch_next, size=10)) == ITEMS
+    assert fetched == [10, 20]
@@ -0,0 +1,36 @@
+import json
+import subprocess
+import sys
+
+# Modules which are slow to import and must only be imported by the commands using them
+HEAVY_MODULES = ["aiohttp", "jwt", "keycloak", "numpy", "pandas", "progressbar", "pygments", "rdflib"]
+# Generous budget in seconds to import the CLI and the profiles commands, which take about 0.15s
+STARTUP_BUDGET = 1.0
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from nexuscli.cli import cli
+cli.get_command(None, "profiles")
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def run_startup():
+    output = subprocess.check_output([sys.executable, "-c", STARTUP_SCRIPT])
+    return json.loads(output.decode("utf-8"))
+
+
+def test_startup_does_not_import_heavy_modules():
+    modules = run_startup()["modules"]
+    assert [m for m in HEAVY_MODULES if m in modules] == []
+    # only the module of the invoked command group is imported
+    assert "nexuscli.profiles" in modules
+    assert "nexuscli.resources" not in modules
+
+
+def test_startup_time():
+    # best of a few runs, to not fail on a busy machine
+    elapsed = min(run_startup()["elapsed"] for _ in range(3))
+    assert elapsed < STARTUP_BUDGET
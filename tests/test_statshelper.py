@@ -0,0 +1,35 @@
+from nexuscli.helpers import statshelper
+
+
+def test_latency_histogram_percentiles():
+    histogram = statshelper.LatencyHistogram()
+    for i in range(1, 1001):
+        histogram.record(i / 1000.0)
+    for p in statshelper.PERCENTILES:
+        expected = p / 100.0
+        assert expected <= histogram.percentile(p) <= expected * (1 + statshelper.LATENCY_PRECISION)
+    assert histogram.percentile(100) == 1.0
+    assert len(histogram.buckets) < 200
+    assert statshelper.LatencyHistogram().percentile(50) is None
+
+
+def test_merge_ingestion_stats():
+    first = statshelper.IngestionStats()
+    first.record_request(201, 0.01)
+    first.record_request(503, 0.02)
+    first.retries += 1
+    first.record_body(100, 40)
+    second = statshelper.IngestionStats()
+    second.record_request(201, 0.03)
+    second.record_request("ClientConnectorError", 0.5)
+    second.concurrency_limit = 4
+
+    first.merge(second)
+    report = first.report(wall_time=2.0)
+    assert report["requests"] == 4
+    assert report["requests_per_second"] == 2.0
+    assert report["retries"] == 1
+    assert report["statuses"] == {"201": 2, "503": 1, "ClientConnectorError": 1}
+    assert report["bytes_raw"] == 100 and report["bytes_sent"] == 40
+    assert report["concurrency_limit"] == 4
+    assert report["latency"]["max"] == 0.5
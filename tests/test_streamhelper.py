@@ -0,0 +1,36 @@
+import datetime
+import gzip
+import types
+
+import pytest
+
+from nexuscli.helpers import streamhelper
+
+
+def test_stream_ndjson_records(tmpdir):
+    path = str(tmpdir.join("data.ndjson.gz"))
+    with gzip.open(path, "wb") as f:
+        f.write(b'{"@id": "a", "v": 1}\n\n{"@id": "b", "v": [1, 2]}\n')
+
+    records = streamhelper.stream_records(path, "ndjson")
+    assert isinstance(records, types.GeneratorType)
+    assert list(records) == [{"@id": "a", "v": 1}, {"@id": "b", "v": [1, 2]}]
+
+
+def test_stream_invalid_ndjson_records(tmpdir):
+    path = tmpdir.join("data.jsonl")
+    path.write('{"@id": "a"}\n[1, 2]\n')
+    with pytest.raises(ValueError, match="Line 2"):
+        list(streamhelper.stream_records(str(path), "jsonl"))
+
+
+def test_stream_parquet_records(tmpdir):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmpdir.join("data.parquet"))
+    table = pa.table({"@id": ["a", "b", "c"], "v": [1, None, 3], "d": [datetime.date(2020, 1, 2)] * 3})
+    pq.write_table(table, path, row_group_size=2)
+
+    records = list(streamhelper.stream_records(path, "parquet"))
+    assert records == [{"@id": "a", "v": 1, "d": "2020-01-02"}, {"@id": "b", "d": "2020-01-02"},
+                       {"@id": "c", "v": 3, "d": "2020-01-02"}]
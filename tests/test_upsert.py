@@ -0,0 +1,76 @@
+import json
+
+from nexuscli import utils
+
+
+def test_existing_payload_checksum_ignores_nexus_context():
+    row = {"@id": "http://example.org/1", "@type": "Person", "name": "n1"}
+    fetched = {"@context": "https://bluebrain.github.io/nexus/contexts/resource.json", "@id": "http://example.org/1",
+               "@type": "Person", "name": "n1", "_rev": 1, "_self": "http://nexus/resources/o/p/_/1"}
+    assert utils.existing_payload_checksum(fetched, row) == utils.generate_nexus_payload_checksum(row)
+    fetched["name"] = "n2"
+    assert utils.existing_payload_checksum(fetched, row) != utils.generate_nexus_payload_checksum(row)
+
+
+def test_existing_payload_checksum_with_row_context():
+    row = {"@context": {"name": "http://schema.org/name"}, "@id": "http://example.org/1", "name": "n1"}
+    fetched = {"@context": [{"name": "http://schema.org/name"},
+                            "https://bluebrain.github.io/nexus/contexts/resource.json"],
+               "@id": "http://example.org/1", "name": "n1", "_rev": 1}
+    assert utils.existing_payload_checksum(fetched, row) == utils.generate_nexus_payload_checksum(row)
+
+
+def rows(nb_rows, **changed):
+    return [{"@id": "http://example.org/%d" % i, "name": changed.get("n%d" % i, "n%d" % i)} for i in range(nb_rows)]
+
+
+def upsert(tmpdir, rows):
+    """ Returns the failures and the number of rows created, updated and unchanged by an upsert. """
+    stats_path = str(tmpdir.join("stats.json"))
+    failures = utils.create_in_nexus(utils._data_model("org", "project", "_", _type="Person"), rows, 4,
+                                     max_retries=0, upsert=True, stats_path=stats_path)
+    with open(stats_path) as f:
+        outcomes = json.load(f)["rows"]
+    return failures, (outcomes["created"], outcomes["updated"], outcomes["unchanged"])
+
+
+def test_upsert_creates_updates_or_skips(nexus, tmpdir):
+    assert upsert(tmpdir, rows(3)) == ([], (3, 0, 0))
+    nexus.requests.clear()
+
+    assert upsert(tmpdir, rows(4, n1="changed")) == ([], (1, 1, 2))
+    assert nexus.requests == {"SEARCH": 1, "POST": 1, "PUT": 1}
+    assert nexus.resources[("org", "project", "http://example.org/1")]["name"] == "changed"
+    assert nexus.resources[("org", "project", "http://example.org/1")]["_rev"] == 2
+    assert nexus.resources[("org", "project", "http://example.org/0")]["_rev"] == 1
+
+
+def test_upsert_fetches_rows_the_view_is_stale_for(nexus, tmpdir):
+    assert upsert(tmpdir, rows(3)) == ([], (3, 0, 0))
+    # updated since the view indexed it
+    nexus.resources[("org", "project", "http://example.org/1")]["_rev"] = 2
+    nexus.stale_revisions["http://example.org/1"] = 1
+    # created since the view was indexed
+    nexus.unindexed.add("http://example.org/2")
+    nexus.requests.clear()
+
+    assert upsert(tmpdir, rows(3, n1="changed", n2="changed")) == ([], (0, 2, 1))
+    # the PUT with the revision of the view and the POST of the unindexed row are rejected, then retried with the
+    # fetched revisions
+    assert nexus.requests == {"SEARCH": 1, "POST": 1, "GET": 2, "PUT": 3}
+    assert nexus.resources[("org", "project", "http://example.org/1")]["_rev"] == 3
+    assert nexus.resources[("org", "project", "http://example.org/2")]["name"] == "changed"
+
+
+def test_upsert_looks_rows_up_in_batches(nexus, tmpdir):
+    nb_rows = 2 * utils.UPSERT_LOOKUP_BATCH_SIZE + 50
+    assert upsert(tmpdir, rows(nb_rows)) == ([], (nb_rows, 0, 0))
+    nexus.requests.clear()
+    assert upsert(tmpdir, rows(nb_rows)) == ([], (0, 0, nb_rows))
+    assert nexus.requests == {"SEARCH": 3}
+
+    # without the view, every row is fetched
+    nexus.view_available = False
+    nexus.requests.clear()
+    assert upsert(tmpdir, rows(nb_rows, n0="changed")) == ([], (0, 1, nb_rows - 1))
+    assert nexus.requests == {"SEARCH": 3, "GET": nb_rows, "PUT": 1}